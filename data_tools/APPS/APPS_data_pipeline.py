@@ -1,13 +1,31 @@
+import logging
+
 from datasets import load_dataset
 
 from ..base_data_pipeline import BaseDataPipeline
-from ..APPS.APPS_data_utils import apps_preprocess_train, apps_preprocess_test
+from ..APPS.APPS_data_utils import apps_preprocess_train, apps_preprocess_test, apps_filter_fn
+from ...envs.code.executors.timeout_store import TimeoutStore
+
+
+logger = logging.getLogger("logger")
 
 
 class APPSDataPipeline(BaseDataPipeline):
-    def __init__(self, dataset_name="APPS", train=True, **kwargs):
+    """
+    Data pipeline for APPS.
+
+    Attributes:
+        timeout_store (str): Path to a JSON of measured per-problem test timeouts, empty for none. Problems
+            of the dataloader missing from it are measured from their reference solutions (see apps_filter_fn).
+        timeout_factor (float): Multiple of the slowest reference test a measured timeout allows.
+    """
+    task_id_column = 'problem_id'
+
+    def __init__(self, dataset_name="APPS", train=True, timeout_store="", timeout_factor=4.0, **kwargs):
         super().__init__(dataset_name, train, **kwargs)
         self.preprocess_fn = apps_preprocess_train if train else apps_preprocess_test
+        self.timeout_store = timeout_store
+        self.timeout_factor = timeout_factor
 
     def _load_raw_dataset(self):
         dataset, dataloader = None, None
@@ -16,3 +34,27 @@ class APPSDataPipeline(BaseDataPipeline):
         if self.dataset_type == 'hf':
             dataset = load_dataset("codeparrot/apps", split=split, trust_remote_code=True)
         return dataset, dataloader
+
+    def get_dataloader(self):
+        dataset, dataloader = super().get_dataloader()
+        if self.timeout_store and dataloader is not None:
+            self.measure_timeouts(dataloader)
+        return dataset, dataloader
+
+    def measure_timeouts(self, dataloader):
+        """
+        Records the per-test timeouts of the problems missing from the timeout store, writing the store once.
+        Problems whose reference solution fails get none, and so the env's default.
+        """
+        store = TimeoutStore(self.timeout_store)
+        # from the id column, without loading the rows of problems already measured
+        missing = [i for i, p_id in enumerate(dataloader[self.task_id_column]) if p_id not in store]
+        if not missing:
+            return
+        logger.info(f"Measuring test timeouts of {len(missing)} problems into {self.timeout_store}")
+        try:
+            for i in missing:
+                apps_filter_fn(dataloader[i], max_len=self.max_len, timeout_store=store,
+                               timeout_factor=self.timeout_factor)
+        finally:
+            store.flush()
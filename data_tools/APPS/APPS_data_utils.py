@@ -3,6 +3,7 @@ import logging
 import json
 
 from ...envs.code.executors.utils_evaluate import safe_eval_answer_from_agent
+from ...envs.code.executors.timeout_store import adaptive_timeout
 
 
 logger = logging.getLogger("logger")
@@ -84,16 +85,21 @@ def check_missing_or_long(example, max_len):
     return False, soln, p_id, task, soln_idx
 
 
-def apps_filter_fn(example, max_len=36000):
+def apps_filter_fn(example, max_len=36000, pool=None, timeout_store=None, timeout_factor=4.0):
     """
     Filter out data points that do not have valid solutions, test cases, or exceed the maximum length.
+    Solutions are executed in `pool` (defaults to the process-wide worker pool), stopping at the
+    first failing test as only the verdict is needed.
+
+    If a TimeoutStore is given, the per-test timeout of each kept problem is set to timeout_factor times
+    the slowest test of its reference solution, for environments and later runs to reuse once the store is flushed.
     """
     discard, soln, p_id, task, soln_idx = check_missing_or_long(example, max_len)
     if discard:
         return False, ''
     example['gpt_codes'] = [soln]
     example['soln_idx'] = soln_idx
-    example = safe_eval_answer_from_agent(example, debug=True, return_output=True)
+    example = safe_eval_answer_from_agent(example, debug=True, return_output=True, pool=pool, fail_fast=True)
     try:
         if type(example['input_output']) == str:
             tests = json.loads(example['input_output'])
@@ -111,4 +117,7 @@ def apps_filter_fn(example, max_len=36000):
     if not example['gpt_pass_flags'][0]:
         print(f"solution gives wrong ans {p_id}\n")
         return False, ''
+    if timeout_store is not None:
+        ref_times = [stats['wall_time'] for stats in example['test_stats'][0]]
+        timeout_store.set(p_id, adaptive_timeout(ref_times, factor=timeout_factor))
     return True, p_id
@@ -6,9 +6,17 @@ import json
 import copy
 
 from evalplus.data import get_mbpp_plus, get_mbpp_plus_hash
+from evalplus.data.utils import CACHE_DIR
 from evalplus.evaluate import get_groundtruth
 from evalplus.eval._special_oracle import MBPP_OUTPUT_NOT_NONE_TASKS
 
+from .ground_truth_store import GroundTruthStore
+
+
+INTRO_STR = ("Write a Python function that satisfies the description below."
+             " Your code must strictly follow the function name and typings of the input and output "
+             "specified in the assert statement below, and pass the assertion when executed.")
+
 
 class MBPPPlusDataset(torch.utils.data.Dataset):
     """
@@ -17,14 +25,16 @@ class MBPPPlusDataset(torch.utils.data.Dataset):
     Attributes:
         problems (dict): Dictionary to store the problems.
         dataset_hash (str): Hash of the dataset.
-        expected_output (dict): Dictionary to store the expected outputs.
+        expected_output (GroundTruthStore): Expected outputs by task id, read lazily from an on-disk store.
         raw_ids (list): List of raw problem IDs.
         dataset_name (str): Name of the dataset.
         eval_later (bool): Flag to indicate if evaluation is to be done at the end in an entire batch (if False, evaluation is done per problem).
         use_public_tests (bool): Flag to indicate if public tests are used.
+
+    Data points share the per task fields and a read-only view of the problem, see get_mbpp_plus_datapoint.
     """
 
-    def __init__(self, dataset_name="MBPP_Plus", eval_later=False, use_public_tests=False):
+    def __init__(self, dataset_name="MBPP_Plus", eval_later=False, use_public_tests=False, ground_truth_dir=CACHE_DIR):
         """
         Initializes the MBPPPlusDataset.
 
@@ -32,30 +42,51 @@ class MBPPPlusDataset(torch.utils.data.Dataset):
             dataset_name (str): Name of the dataset. Default is "MBPP_Plus".
             eval_later (bool): Flag to indicate if evaluation is to be done  the end in an entire batch (if False, evaluation is done per problem). Default is False.
             use_public_tests (bool): Flag to indicate if public tests are to be used. Default is False.
+            ground_truth_dir (str): Directory of the ground truth store. Default is the evalplus cache.
         """
         self.problems = {}
         self.dataset_hash = None
         self.expected_output = {}
         self.raw_ids = []
         self.dataset_name = dataset_name
+        self.ground_truth_dir = ground_truth_dir
         self.eval_later = eval_later
         self.use_public_tests = use_public_tests
+        # per task, computed on first access
+        self._task_fields = {}
+        self._problem_views = {}
 
         noextreme = 'noextreme' in dataset_name
         if noextreme:
             print("noextreme")
         self.problems = get_mbpp_plus(noextreme=noextreme)
+        self.dataset_hash = get_mbpp_plus_hash(noextreme=noextreme)
         if not (self.use_public_tests and self.eval_later):
-            dataset_hash = get_mbpp_plus_hash(noextreme=noextreme)
-            self.expected_output = get_groundtruth(
-                self.problems,
-                dataset_hash,
-                MBPP_OUTPUT_NOT_NONE_TASKS,
-            )
+            self.load_expected_output()
         self.raw_ids = list(self.problems.keys())
         # so reference by idx is deterministic
         self.raw_ids.sort()
 
+    def load_expected_output(self):
+        """
+        Opens the ground truth store of the dataset, building it on first use, if not opened yet.
+        Outputs are then read per task on access.
+
+        Returns:
+            GroundTruthStore: Expected outputs keyed by task id.
+        """
+        if not self.expected_output:
+            store = GroundTruthStore(self.ground_truth_dir, self.dataset_hash)
+            if not store.exists():
+                # computed (or loaded in full) once, then read per task from the store
+                store.build(get_groundtruth(
+                    self.problems,
+                    self.dataset_hash,
+                    MBPP_OUTPUT_NOT_NONE_TASKS,
+                ))
+            self.expected_output = store
+        return self.expected_output
+
     def __len__(self):
         """
         Returns the length of the dataset.
@@ -80,6 +111,8 @@ class MBPPPlusDataset(torch.utils.data.Dataset):
     def get_mbpp_plus_datapoint(self, idx):
         """
         Retrieves a data point from the dataset.
+        Nothing is copied: the problem is a read-only view shared by every data point of the task
+        (deep-copy it to modify it), and the prompt and tests are computed once per task.
 
         Args:
             idx (int): Index of the data point to retrieve.
@@ -88,34 +121,80 @@ class MBPPPlusDataset(torch.utils.data.Dataset):
             dict: Data point at the given index.
         """
         raw_id = self.raw_ids[idx]
-        test_datapoint = {}
-        raw_datapoint = self.problems[raw_id]
+        task_fields = self._get_task_fields(raw_id)
+        test_datapoint = dict(task_fields)
 
         if not (self.use_public_tests and self.eval_later):
-            raw_ans = self.expected_output[raw_id]
-            test_datapoint['mbpp_plus_problem'] = copy.deepcopy(raw_datapoint)
-            test_datapoint['mbpp_plus_output'] = copy.deepcopy(raw_ans)
-
-        test_datapoint['task_id'] = raw_datapoint['task_id']
-
-        intro_str = ("Write a Python function that satisfies the description below."
-                     " Your code must strictly follow the function name and typings of the input and output "
-                     "specified in the assert statement below, and pass the assertion when executed.")
-        test_datapoint['task'] = raw_datapoint['prompt']
-        test_datapoint['task_prompt'] = intro_str + '\n' + raw_datapoint['prompt']
-        test_datapoint['gt_fn_name'] = raw_datapoint['entry_point']
-        test_datapoint['code'] = raw_datapoint['canonical_solution']
-
-        test_datapoint["test_list"] = [''] * (len(raw_datapoint['base_input']) + len(raw_datapoint['plus_input']))
+            test_datapoint['mbpp_plus_problem'] = self._problem_views[raw_id]
+            # read from the store, so already a private copy
+            test_datapoint['mbpp_plus_output'] = self.expected_output[raw_id]
 
         if self.use_public_tests:
+            if task_fields['public_test_list'] is None:
+                raw_datapoint = self.problems[raw_id]
+                raise ValueError(f"no assert in id {raw_datapoint['task_id']}. prompt:\n{raw_datapoint['prompt']}")
+            # the only per data point list, as envs keep it as their own
+            test_datapoint['public_test_list'] = list(task_fields['public_test_list'])
+        else:
+            del test_datapoint['public_test_list']
+        return test_datapoint
+
+    def _get_task_fields(self, raw_id):
+        """
+        Fields of the data points of a task that do not depend on the settings, computed on first access.
+        public_test_list is None if the prompt has no assert statement.
+        """
+        task_fields = self._task_fields.get(raw_id)
+        if task_fields is None:
+            raw_datapoint = self.problems[raw_id]
             assert_statement = ''
             for line in raw_datapoint['prompt'].split('\n'):
                 if 'assert' in line and raw_datapoint['entry_point'] in line:
                     assert_statement = line
                     break
-            if assert_statement:
-                test_datapoint["public_test_list"] = [assert_statement]
-            else:
-                raise ValueError(f"no assert in id {raw_datapoint['task_id']}. prompt:\n{raw_datapoint['prompt']}")
-        return test_datapoint
+            task_fields = {
+                'task_id': raw_datapoint['task_id'],
+                'task': raw_datapoint['prompt'],
+                'task_prompt': INTRO_STR + '\n' + raw_datapoint['prompt'],
+                'gt_fn_name': raw_datapoint['entry_point'],
+                'code': raw_datapoint['canonical_solution'],
+                # placeholders, the tests are run from the problem's inputs. immutable, so shared
+                'test_list': ('',) * (len(raw_datapoint['base_input']) + len(raw_datapoint['plus_input'])),
+                'public_test_list': (assert_statement,) if assert_statement else None,
+            }
+            self._task_fields[raw_id] = task_fields
+            self._problem_views[raw_id] = ReadOnlyDict(raw_datapoint)
+        return task_fields
+
+    def task_ids(self):
+        """
+        Task id of each data point, by index, without building the data points (see BaseDataPipeline.get_task_index).
+        """
+        return [self.problems[raw_id]['task_id'] for raw_id in self.raw_ids]
+
+    def get_code(self, idx):
+        """
+        Reference solution of the data point at idx, without building the data point (see AccedingSequenceLengthSampler).
+        """
+        return self.problems[self.raw_ids[idx]]['canonical_solution']
+
+
+class ReadOnlyDict(dict):
+    """
+    Read-only view of a dict, to share it between consumers without copying.
+    Values are shared too, so must not be mutated in place. copy.deepcopy (or pickling) gives a mutable dict.
+    """
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("ReadOnlyDict cannot be modified, modify a copy.deepcopy of it instead")
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def copy(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
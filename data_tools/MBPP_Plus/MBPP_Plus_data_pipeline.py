@@ -4,11 +4,13 @@ from ..MBPP_Plus.MBPP_Plus_Dataset import MBPPPlusDataset
 
 
 class MBPPPlusDataPipeline(BaseDataPipeline):
-    def __init__(self, dataset_name="MBPP_Plus", train=True, **kwargs):
+    def __init__(self, dataset_name="MBPP_Plus", train=True, eval_workers=0, **kwargs):
         super().__init__(dataset_name, train, **kwargs)
+        # processes to score samples with after inference in eval_later mode, 0 to only write samples.jsonl
+        self.eval_workers = eval_workers
 
     def postprocess(self, **kwargs):
-        postprocess_mbpp_plus(**kwargs)
+        postprocess_mbpp_plus(eval_workers=self.eval_workers, **kwargs)
 
     def _load_raw_dataset(self):
         """
@@ -1,9 +1,23 @@
-from evalplus.data import write_jsonl
+import json
+import multiprocessing
+import os
+
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from tqdm import tqdm
+
+from evalplus.data import load_solutions, write_jsonl
+from evalplus.data.mbpp import mbpp_serialize_inputs
+from evalplus.eval import PASS
+from evalplus.evaluate import check_correctness
 
 from cognitive_base.utils import load_json
 from cognitive_base.utils.log import construct_task_folder
 
-def postprocess_mbpp_plus(dataloader, dataset, result_dir):
+
+def postprocess_mbpp_plus(dataloader, dataset, result_dir, eval_workers=0):
     """
     Post-processes the MBPP Plus results for eval by consolidating into a JSONL file.
 
@@ -11,6 +25,7 @@ def postprocess_mbpp_plus(dataloader, dataset, result_dir):
         dataloader (DataLoader): The data loader providing batches of data.
         dataset (Dataset): The dataset being processed.
         result_dir (str): The directory where the results are stored.
+        eval_workers (int): If > 0, also scores the samples with this many processes (see evaluate_mbpp_plus_samples).
 
     Returns:
         None
@@ -29,4 +44,107 @@ def postprocess_mbpp_plus(dataloader, dataset, result_dir):
         output_d = load_json(f"{task_folder}/output.json")
         samples.append({'task_id': task_id, 'solution': output_d.get('full_code', '')})
     write_jsonl(f"{result_dir}/samples.jsonl", samples)
-    
\ No newline at end of file
+    if eval_workers > 0:
+        evaluate_mbpp_plus_samples(f"{result_dir}/samples.jsonl", dataset, num_workers=eval_workers)
+
+
+def evaluate_mbpp_plus_samples(
+    samples_path,
+    dataset,
+    num_workers=None,
+    min_time_limit=1,
+    gt_time_limit_factor=4,
+    test_details=False,
+):
+    """
+    Scores every sample in a samples.jsonl against the MBPP Plus base and plus tests, across a process pool,
+    and writes the results next to it as <name>_eval_results.json, in the format of the evalplus evaluator
+    (see eval_utils.io.load_evaluation_result).
+
+    Args:
+        samples_path (str): Path to the samples JSONL, with 'task_id' and 'solution' per line.
+        dataset (MBPPPlusDataset): The dataset, whose problems and ground truth are reused
+            (the ground truth is loaded if the dataset did not need it).
+        num_workers (int, optional): Number of processes. Defaults to half the cores, as evalplus does.
+        min_time_limit (float): Minimum time limit per test in seconds.
+        gt_time_limit_factor (float): Time limit per test as a multiple of the ground truth's time.
+        test_details (bool): Run all tests and report every failing input, instead of stopping at the first.
+
+    Returns:
+        dict: The evaluation results, with 'date', 'hash' and 'eval' (task id -> list of sample results).
+    """
+    dataset = getattr(dataset, 'dataset', dataset)  # unwrap Subset
+    problems = dataset.problems
+    expected_output = dataset.load_expected_output()
+    num_workers = num_workers or max(1, multiprocessing.cpu_count() // 2)
+
+    eval_results = defaultdict(list)
+    completion_id = Counter()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = []
+        for sample in load_solutions(samples_path):
+            task_id = sample['task_id']
+            if task_id not in problems:
+                print(f"Task {task_id} is found in the samples but not found in the dataset")
+                continue
+            solution = sample['solution'] if 'solution' in sample else problems[task_id]['prompt'] + sample['completion']
+            futures.append(executor.submit(
+                check_correctness,
+                'mbpp',
+                completion_id[task_id],
+                problems[task_id],
+                solution,
+                expected_output[task_id],
+                False,
+                not test_details,  # fast_check
+                sample['_identifier'],
+                min_time_limit,
+                gt_time_limit_factor,
+            ))
+            completion_id[task_id] += 1
+        for future in tqdm(as_completed(futures), total=len(futures), desc='evaluating MBPP Plus samples'):
+            result = future.result()
+            eval_results[result['task_id']].append(result)
+
+    results = {
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
+        'hash': dataset.dataset_hash,
+        'eval': {},
+    }
+    for task_id, task_results in eval_results.items():
+        task_results.sort(key=lambda x: x['completion_id'])
+        problem = problems[task_id]
+        results['eval'][task_id] = [
+            {
+                'task_id': task_id,
+                'solution': res['solution'],
+                'base_status': res['base'][0],
+                'plus_status': res['plus'][0],
+                'base_fail_tests': mbpp_serialize_inputs(
+                    task_id, _get_failed_tests(*res['base'], problem['base_input'], test_details)
+                ),
+                'plus_fail_tests': mbpp_serialize_inputs(
+                    task_id, _get_failed_tests(*res['plus'], problem['plus_input'], test_details)
+                ),
+            }
+            for res in task_results
+        ]
+
+    result_path = os.path.splitext(samples_path)[0] + '_eval_results.json'
+    with open(result_path, 'w') as f:
+        json.dump(results, f)
+    num_passed = sum(
+        res['base_status'] == res['plus_status'] == PASS for task_results in results['eval'].values()
+        for res in task_results
+    )
+    print(f"MBPP Plus: {num_passed}/{len(futures)} samples pass base and plus tests, results in {result_path}")
+    return results
+
+
+def _get_failed_tests(stat, details, inputs, test_details=False):
+    # as evalplus reports them: every failing input with test_details, else the last input run
+    if stat == PASS or not details:
+        return []
+    if test_details:
+        return [inputs[i] for i in range(len(details)) if not details[i]]
+    return [inputs[len(details) - 1]]
@@ -0,0 +1,133 @@
+"""
+On-disk store of MBPP Plus ground truth outputs, read lazily per task.
+
+evalplus keeps the ground truth of all problems in one pickle, so every process that needs the expected
+outputs of one task loads (and holds) those of all of them, hundreds of MB. Here each task's outputs are
+pickled separately into one data file, with an index of their offsets. Readers memory-map the data file,
+so opening the store is near-instant, a task costs only its own bytes, and the pages are shared by every
+process on the host through the page cache.
+
+A store is versioned by the dataset hash (see evalplus.data.get_mbpp_plus_hash) and by STORE_VERSION.
+"""
+import fcntl
+import json
+import mmap
+import os
+import pickle
+import tempfile
+import threading
+
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+# bump when the layout of the files changes
+STORE_VERSION = 1
+
+
+class GroundTruthStore(Mapping):
+    """
+    Read-only mapping of task id to its ground truth outputs (as in evalplus.evaluate.get_groundtruth),
+    unpickled from disk on every access, so each access returns a private copy.
+
+    Attributes:
+        data_path (str): Path of the data file, the concatenated pickles of each task's outputs.
+        index_path (str): Path of the JSON index, task id to (offset, length) in the data file.
+    """
+    def __init__(self, store_dir: str, dataset_hash: str):
+        prefix = os.path.join(store_dir, f"{dataset_hash}_ground_truth_v{STORE_VERSION}")
+        self.data_path = prefix + '.bin'
+        self.index_path = prefix + '.index.json'
+        self._index: Optional[Dict[str, list]] = None
+        self._file = None
+        self._mmap = None
+        # readers may be threads, eg parallel actors sharing the env's store
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.index_path)
+
+    def build(self, expected_output: Dict[str, Any]):
+        """
+        Writes the store from the ground truth of all tasks. Concurrent builders are serialized with a lock,
+        and files are replaced atomically, so readers never see a partial store.
+        """
+        store_dir = os.path.dirname(self.data_path)
+        os.makedirs(store_dir, exist_ok=True)
+        with open(self.index_path + '.lock', 'w') as lock_f:
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                if self.exists():
+                    return
+                index = {}
+                with tempfile.NamedTemporaryFile('wb', dir=store_dir, delete=False) as f:
+                    for task_id in sorted(expected_output):
+                        data = pickle.dumps(expected_output[task_id], protocol=pickle.HIGHEST_PROTOCOL)
+                        index[task_id] = [f.tell(), len(data)]
+                        f.write(data)
+                os.replace(f.name, self.data_path)
+                # the index goes last, as it marks the store complete
+                with tempfile.NamedTemporaryFile('w', dir=store_dir, delete=False) as f:
+                    json.dump({'version': STORE_VERSION, 'tasks': index}, f)
+                os.replace(f.name, self.index_path)
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+    @property
+    def index(self) -> Dict[str, list]:
+        if self._index is None:
+            with open(self.index_path, 'r') as f:
+                self._index = json.load(f)['tasks']
+        return self._index
+
+    def _open(self):
+        with self._lock:
+            if self._file is not None:
+                return
+            f = open(self.data_path, 'rb')
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # eg empty file, or a filesystem without mmap support
+                self._mmap = None
+            # set last, as it marks the store open
+            self._file = f
+
+    def _read(self, offset: int, length: int) -> bytes:
+        if self._file is None:
+            self._open()
+        if self._mmap is not None:
+            return self._mmap[offset:offset + length]
+        # pread rather than seek and read, which would race on the file position
+        return os.pread(self._file.fileno(), length, offset)
+
+    def __getitem__(self, task_id: str) -> Any:
+        offset, length = self.index[task_id]
+        return pickle.loads(self._read(offset, length))
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+            if self._file is not None:
+                self._file.close()
+            self._file, self._mmap = None, None
+
+    def __getstate__(self):
+        # file handles are reopened lazily, eg in dataloader or evaluation worker processes
+        state = self.__dict__.copy()
+        state['_file'], state['_mmap'] = None, None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -1,7 +1,9 @@
 import torch
 
 from torch.utils.data import DataLoader
-from typing import List
+from typing import List, Optional
+
+from .prefetch import PrefetchLoader
 
 
 class BaseDataPipeline:
@@ -19,6 +21,7 @@ class BaseDataPipeline:
         dataset_type (str): Type of the dataset (e.g., 'pytorch').
         eval_later (bool): Whether to evaluate at the end of inference in bulk.
         use_public_tests (bool): Whether to use public tests.
+        prefetch_depth (int): Batches the dataloader attached to an agent loads ahead in the background, 0 for none.
         kwargs (dict): Additional keyword arguments.
         preprocess_fn (function): Function for preprocessing data.
     Methods:
@@ -30,7 +33,14 @@ class BaseDataPipeline:
             Abstract method to be implemented by subclasses to return the dataset.
         get_dataloader():
             Prepares and returns the dataset and dataloader.
+        get_task_index(dataset, dataloader):
+            Task ids of the batches the dataloader yields, without loading them, to skip finished tasks.
+        get_batch(dataset, dataloader, key):
+            The batch of a task in the index.
     """
+    # column of task ids in hf datasets, for get_task_index
+    task_id_column = 'task_id'
+
     def __init__(
         self,
         dataset_name,
@@ -46,6 +56,7 @@ class BaseDataPipeline:
         use_public_tests=False,
         do_val=False,
         val_size=50,
+        prefetch_depth=0,
         **kwargs
     ):
         self.dataset_name = dataset_name
@@ -61,6 +72,7 @@ class BaseDataPipeline:
         self.use_public_tests = use_public_tests
         self.validation = do_val
         self.validation_size = val_size
+        self.prefetch_depth = prefetch_depth
         self.kwargs = kwargs
         self.preprocess_fn = generic_preprocess_train if train else generic_preprocess_test
        
@@ -124,8 +136,47 @@ class BaseDataPipeline:
         )
         return dataset, dataloader
     
+    def get_task_index(self, dataset, dataloader) -> Optional[List[tuple]]:
+        """
+        Indexes the batches (of one task) the dataloader yields, in order, from a cheap index of task ids
+        (the task_ids() of pytorch datasets, the task_id_column of hf ones) rather than by loading the tasks.
+
+        Returns:
+            list: (task id, key) per batch, where key fetches the batch with get_batch.
+                None if the dataset has no such index, or batches hold several tasks.
+        """
+        if self.dataset_type == 'pytorch':
+            if getattr(dataloader, 'batch_size', None) != 1:
+                return None
+            base, indices = dataset, None
+            if isinstance(dataset, torch.utils.data.Subset):
+                base, indices = dataset.dataset, dataset.indices
+            task_ids_fn = getattr(base, 'task_ids', None)
+            if task_ids_fn is None:
+                return None
+            task_ids = task_ids_fn()
+            if indices is not None:
+                task_ids = [task_ids[j] for j in indices]
+            # the order of the sampler, eg a curriculum
+            return [(task_ids[idx], idx) for idx in dataloader.sampler]
+        elif self.dataset_type == 'hf':
+            if self.task_id_column not in getattr(dataloader, 'column_names', ()):
+                return None
+            return [(task_id, i) for i, task_id in enumerate(dataloader[self.task_id_column])]
+        return None
+
+    def get_batch(self, dataset, dataloader, key):
+        """
+        The batch the dataloader yields for key, from get_task_index.
+        """
+        if self.dataset_type == 'pytorch':
+            return dataloader.collate_fn([dataset[key]])
+        return dataloader[key]
+
     def attach_to_agent(self, actor):
         _, dataloader = self.get_dataloader()
+        if self.prefetch_depth > 0:
+            dataloader = PrefetchLoader(dataloader, self.prefetch_depth)
         actor.dataloader = dataloader
 
 
@@ -167,7 +218,12 @@ class AccedingSequenceLengthSampler(torch.utils.data.Sampler):
         return len(self.data)
 
     def __iter__(self):
-        sizes = torch.tensor([len(x['code']) for x in self.data])
+        # datasets with get_code skip building every data point just for its length
+        get_code = getattr(self.data, 'get_code', None)
+        if get_code is not None:
+            sizes = torch.tensor([len(get_code(i)) for i in range(len(self.data))])
+        else:
+            sizes = torch.tensor([len(x['code']) for x in self.data])
         yield from torch.argsort(sizes).tolist()
 
 
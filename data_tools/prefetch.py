@@ -0,0 +1,87 @@
+"""
+Background prefetching of tasks, so loading and preprocessing the next tasks overlaps with the agent's work
+on the current one (mostly waiting on the LLM) instead of running on the critical path.
+
+Items are produced by a background thread into a bounded queue, so at most `depth` items are ready ahead
+of the consumer. Exceptions of the producer are raised in the consumer, at the item they occurred at.
+"""
+import queue
+import threading
+
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+def prefetch(iterable: Iterable[T], depth: int) -> Iterator[T]:
+    """
+    Iterates iterable in a background thread, up to depth items ahead of the caller.
+    With depth <= 0, iterates it in the caller's thread as is.
+    Closing the returned generator (eg breaking out of a for loop) stops the background thread
+    after the item it is producing.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((True, _DONE))
+        except BaseException as e:
+            put((False, e))
+
+    thread = threading.Thread(target=produce, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = items.get()
+            if not ok:
+                raise item
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+class PrefetchLoader:
+    """
+    Wraps a dataloader so that iterating it loads up to depth batches ahead in a background thread
+    (see prefetch). Other attributes are those of the dataloader.
+
+    Attributes:
+        dataloader (iterable): The wrapped dataloader.
+        depth (int): Number of batches loaded ahead.
+    """
+    def __init__(self, dataloader, depth: int):
+        self.dataloader = dataloader
+        self.depth = depth
+
+    def __iter__(self):
+        return prefetch(self.dataloader, self.depth)
+
+    def __len__(self):
+        return len(self.dataloader)
+
+    def __getattr__(self, name):
+        if name == 'dataloader':
+            # not set yet, eg while unpickling
+            raise AttributeError(name)
+        return getattr(self.dataloader, name)
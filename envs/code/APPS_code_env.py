@@ -1,8 +1,12 @@
-import copy
+import logging
 from pprint import pp
-from .executors.utils_evaluate import safe_eval_answer_from_agent
+from .executors.utils_evaluate import safe_eval_answer_from_agent, get_apps_worker_pool
+from .executors.timeout_store import TimeoutStore
+from .executors.compiled_tests import load_compiled_test_set
 from .base_code_env import BaseCodeEnv
 
+logger = logging.getLogger("logger")
+
 
 class AppsCodeEnv(BaseCodeEnv):
     """
@@ -15,11 +19,17 @@ class AppsCodeEnv(BaseCodeEnv):
         test_prefix (str): Prefix to add before each test case, e.g., setup code or imports.
         use_public_tests (bool): Flag to use public tests instead of private ones.
         public_tests (list): A list of public test cases.
-        APPS_datapoint (dict): Data specific to the APPS dataset, if applicable.
+        APPS_datapoint (dict): The fields of the APPS datapoint that execution needs (problem_id, input_output,
+            test_timeout, and the pre-parsed compiled_tests), shared with the task rather than copied.
         dataset_name (str): The name of the dataset being used.
         max_tests (int): The maximum number of tests to display in feedback.
         max_chars (int): The maximum number of characters to display per test in feedback.
         enable_input_hints (bool): Flag to enable input handling hints.
+        worker_pool (WorkerPool): Pool of persistent worker processes that executions are submitted to.
+        default_test_timeout (float): Time limit per test when the problem has no measured budget.
+        timeout_store (TimeoutStore): Measured per-problem test timeouts, if any.
+        test_timeout (float): Time limit per test for the current task.
+        test_shards (int): Number of shards the tests of a step are split into to run in parallel.
     """
     def __init__(
         self,
@@ -29,6 +39,13 @@ class AppsCodeEnv(BaseCodeEnv):
         use_public_tests=False,
         dataset_name="APPS",
         enable_input_hints=False,
+        num_exec_workers=1,
+        max_jobs_per_worker=20,
+        zygote_executor=False,
+        fail_fast=False,
+        test_timeout=None,
+        timeout_store="",
+        test_shards=1,
         **kwargs
     ):
         """
@@ -42,6 +59,15 @@ class AppsCodeEnv(BaseCodeEnv):
             do_train (bool): Flag indicating if the environment is in training mode.
             do_test (bool): Flag indicating if the environment is in testing mode.
             dataset_name (str): The name of the dataset being used.
+            num_exec_workers (int): Number of persistent worker processes for code execution.
+            max_jobs_per_worker (int): Executions a worker runs before it is recycled.
+            zygote_executor (bool): Fork a pre-warmed child per execution instead of reusing workers.
+            fail_fast (bool): For official (private test) evaluation, stop at the first failing test.
+            test_timeout (float): Time limit in seconds per test, sub-second allowed. Defaults to the runner's.
+            timeout_store (str): Path to a JSON of measured per-problem test timeouts (see APPSDataPipeline),
+                which take precedence over test_timeout.
+            test_shards (int): Split the tests of a step into shards run in parallel by the workers,
+                for problems with many slow tests. Needs num_exec_workers >= test_shards to be parallel.
             **kwargs: Additional keyword arguments.
         """
         super().__init__(
@@ -55,9 +81,47 @@ class AppsCodeEnv(BaseCodeEnv):
         self.generic_code_env = True
         self.APPS_datapoint = {}
         self.enable_input_hints = enable_input_hints
+        self.fail_fast = fail_fast
+        self.default_test_timeout = test_timeout
+        self.timeout_store = TimeoutStore(timeout_store) if timeout_store else None
+        self.test_timeout = test_timeout
+        self.test_shards = test_shards
+        self.worker_pool = get_apps_worker_pool(
+            num_workers=num_exec_workers,
+            max_jobs_per_worker=max_jobs_per_worker,
+            zygote=zygote_executor,
+            memory_limit=self.memory_limit,
+        )
 
     def _reset(self, task):
-        self.APPS_datapoint = copy.deepcopy(task)
+        # not the whole row, which carries every reference solution. the fields are only read, so not copied
+        self.APPS_datapoint = {k: task[k] for k in ('problem_id', 'input_output', 'test_timeout') if k in task}
+        try:
+            # parsed and normalized once per problem, shared by all steps on it
+            self.APPS_datapoint['compiled_tests'] = load_compiled_test_set(
+                task['input_output'], task.get('problem_id'))
+        except Exception as e:
+            logger.info(f"Failed to compile unit tests for problem {task.get('problem_id')}: {e}")
+        self.test_timeout = self.default_test_timeout
+        if self.timeout_store is not None:
+            self.test_timeout = self.timeout_store.get(task.get('problem_id'), self.default_test_timeout)
+
+    def _test_set_parts(self):
+        return self.APPS_datapoint.get('problem_id'), self.APPS_datapoint.get('input_output')
+
+    def _exec_settings(self, use_public_tests):
+        return (
+            *super()._exec_settings(use_public_tests),
+            self.fail_fast,
+            self.test_timeout,
+            self.enable_input_hints,
+        )
+
+    def _is_cacheable(self, result):
+        # no execution details means a job timed out or crashed. a -1 outcome may be a test that ran out of time
+        # (eg under load, or with a tight test_timeout). either may not happen again
+        obs, _, _, info = result
+        return obs != execution_error_str and -1 not in info['individual_results']
 
     def construct_env_feedback(self, outcomes, all_outputs, use_public_tests):
         """
@@ -83,7 +147,7 @@ class AppsCodeEnv(BaseCodeEnv):
             exe_output, expected_output, test_input = all_output
             exe_output, expected_output, test_input = str(exe_output), str(expected_output), str(test_input)
             if outcome == True:
-                # outcome can be -1 or -2 if error
+                # outcome can be -1, -2 or -3 if error
                 if self.max_tests and success_display < self.max_tests:
                     feedback += (
                         f"\n Input: {test_input[:self.max_chars // 2]} "
@@ -101,6 +165,8 @@ class AppsCodeEnv(BaseCodeEnv):
                         fail_str += ' # Runtime error or time limit exceeded error'
                     if outcome == -2:
                         fail_str += ' # Compile Error'
+                    if outcome == -3:
+                        fail_str += ' # Output limit exceeded'
                     # Add input handling hint if enabled and output is blank/empty
                     if exe_output == '[]' and self.enable_input_hints:
                         fail_str += input_hint_str
@@ -128,20 +194,37 @@ class AppsCodeEnv(BaseCodeEnv):
             ExecuteResult: An object containing the execution result, feedback, and state.
         """
         # env_out = ExecuteResult(False, '\n Error during execution\n', (False,))
-        obs, reward, _, individual_results = '\n Error during execution\n', False, False, (False,)
-
-        example = copy.deepcopy(self.APPS_datapoint)
-        example['gpt_codes'] = [full_code]
-        example = safe_eval_answer_from_agent(example, return_output=True)
+        obs, reward, _, individual_results = execution_error_str, False, False, (False,)
+        skipped_tests = 0
+        test_stats = []
+
+        # results are added as new keys, so a shallow copy keeps the datapoint intact
+        example = {**self.APPS_datapoint, 'gpt_codes': [full_code]}
+        example = safe_eval_answer_from_agent(
+            example,
+            return_output=True,
+            pool=self.worker_pool,
+            num_workers=self.worker_pool.num_workers,
+            fail_fast=self.fail_fast and not use_public_tests,
+            test_timeout=self.test_timeout,
+            num_shards=self.test_shards,
+            # the compiled tests are sent to each worker once per task
+            tests_key=self.get_test_set_id() if 'compiled_tests' in self.APPS_datapoint else None,
+        )
         if example.get('details', ''):
             outcomes, all_outputs = example['details'][0]
             obs = self.construct_env_feedback(outcomes, all_outputs, use_public_tests)
             # individual_results = tuple([res == True for res in outcomes])  # can be -1 or -2 to indicate errors
             individual_results = outcomes
+            skipped_tests = example['skipped_tests'][0]
+            test_stats = example['test_stats'][0]
             # env_out = ExecuteResult(example['gpt_pass_flags'][0], feedback, state)
             reward = example['gpt_pass_flags'][0]
 
-        return obs, reward, None, {'individual_results': individual_results}
+        info = {'individual_results': individual_results, 'skipped_tests': skipped_tests, 'test_stats': test_stats}
+        return obs, reward, None, info
+
+execution_error_str = '\n Error during execution\n'
 
 input_hint_str = """
 No output detected. You might want to check the reading from / writing to standard IO.
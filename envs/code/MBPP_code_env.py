@@ -1,6 +1,7 @@
 from .base_code_env import BaseCodeEnv
+from .exec_cache import make_content_key
 
-from .executors.py_executor import PyExecutor
+from .executors.py_executor import PyExecutor, get_mbpp_worker_pool
 
 
 class MbppCodeEnv(BaseCodeEnv):
@@ -19,6 +20,8 @@ class MbppCodeEnv(BaseCodeEnv):
         dataset_name (str): The name of the dataset being used.
         max_tests (int): The maximum number of tests to display in feedback.
         max_chars (int): The maximum number of characters to display per test in feedback.
+        test_isolation (str): 'fresh' to define the code per test, 'shared' to define it once for all its tests.
+        worker_pool (WorkerPool): Pool of persistent worker processes that tests are submitted to.
     """
     def __init__(
         self,
@@ -27,6 +30,9 @@ class MbppCodeEnv(BaseCodeEnv):
         max_display_chars=None,
         use_public_tests=False,
         dataset_name="MBPP",
+        test_isolation="fresh",
+        num_exec_workers=1,
+        max_jobs_per_worker=None,
         **kwargs
     ):
         """
@@ -40,6 +46,12 @@ class MbppCodeEnv(BaseCodeEnv):
             do_train (bool): Flag indicating if the environment is in training mode.
             do_test (bool): Flag indicating if the environment is in testing mode.
             dataset_name (str): The name of the dataset being used.
+            test_isolation (str): 'fresh' to define the code again for every test, so no state leaks between tests.
+                'shared' to define it once and run each test in a copy of its globals, which is faster but lets
+                objects the code mutates (eg module-level lists, mutable default arguments) carry over.
+            num_exec_workers (int): Number of persistent worker processes for code execution, shared by all
+                MBPP envs (eg parallel actors) of the process.
+            max_jobs_per_worker (int): Tests a worker runs before it is recycled, None for the pool's default.
             **kwargs: Additional keyword arguments.
         """
         super().__init__(
@@ -50,7 +62,18 @@ class MbppCodeEnv(BaseCodeEnv):
             dataset_name=dataset_name,
             **kwargs,
         )
-        self.exe = PyExecutor(max_display_tests=max_display_tests, max_display_chars=max_display_chars)
+        self.worker_pool = get_mbpp_worker_pool(
+            num_workers=num_exec_workers,
+            max_jobs_per_worker=max_jobs_per_worker,
+            memory_limit=self.memory_limit,
+        )
+        self.test_isolation = test_isolation
+        self.exe = PyExecutor(
+            max_display_tests=max_display_tests,
+            max_display_chars=max_display_chars,
+            pool=self.worker_pool,
+            isolation=test_isolation,
+        )
         self.mbpp_plus_data = ()
 
     def _reset(self, task):
@@ -68,6 +91,21 @@ class MbppCodeEnv(BaseCodeEnv):
         else:
             self.mbpp_plus_data = ()
 
+    def _test_set_parts(self):
+        parts = super()._test_set_parts()
+        if self.mbpp_plus_data:
+            problem, expected_output = self.mbpp_plus_data
+            # the inputs, expected outputs and time budgets themselves, which a dataset revision can change
+            parts += (problem['task_id'], make_content_key(dict(problem), expected_output))
+        return parts
+
+    def _exec_settings(self, use_public_tests):
+        return (*super()._exec_settings(use_public_tests), self.test_isolation)
+
+    def _is_cacheable(self, result):
+        # a test that timed out or crashed its worker may not do so again
+        return not result[3].get('timed_out')
+
     def _step(self, full_code, use_public_tests=False):
         """
         Executes the given code against the test cases and generates feedback.
@@ -83,8 +121,11 @@ class MbppCodeEnv(BaseCodeEnv):
             mbpp_plus_data=() if use_public_tests else self.mbpp_plus_data,
             use_public_tests=use_public_tests
         )
-        reward, obs, individual_results = exe_out
-
-        return obs, reward, None, {'individual_results': individual_results}
+        info = {
+            'individual_results': exe_out.state,
+            'test_stats': list(exe_out.test_stats),
+            'timed_out': exe_out.timed_out,
+        }
+        return exe_out.feedback, exe_out.is_passing, None, info
     
 
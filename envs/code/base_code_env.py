@@ -1,5 +1,12 @@
+import asyncio
+import contextvars
+import functools
 import logging
-from typing import Tuple, Dict, Any, Union
+
+from concurrent.futures import Executor
+from typing import Tuple, Dict, Any, Optional, Union
+
+from .exec_cache import ExecutionCache, make_cache_key
 
 logger = logging.getLogger("logger")
 
@@ -18,7 +25,15 @@ class BaseCodeEnv:
         dataset_name (str): The name of the dataset being used.
         max_tests (int): The maximum number of tests to display in feedback.
         max_chars (int): The maximum number of characters to display per test in feedback.
+        exec_cache (ExecutionCache): On-disk cache of step results, if enabled.
+        memory_limit (int): Memory an execution can allocate in bytes, 0 for no limit.
+        task_test_stats (list): Measurements of the tests run by the steps on the current task, in the order they
+            ran (see record_test_stats), saved with the task's output by EvalManager. Steps served from
+            exec_cache run no tests, so add none.
     """
+    # bump when a change to execution or feedback invalidates cached step results
+    executor_version = 6
+
     def __init__(
         self,
         timeout=10,
@@ -26,6 +41,9 @@ class BaseCodeEnv:
         max_display_chars=None,
         use_public_tests=False,
         dataset_name="MBPP",
+        exec_cache_dir="",
+        exec_cache_max_mb=1024,
+        memory_limit_mb=0,
         **kwargs
     ):
         """
@@ -39,6 +57,9 @@ class BaseCodeEnv:
             do_train (bool): Flag indicating if the environment is in training mode.
             do_test (bool): Flag indicating if the environment is in testing mode.
             dataset_name (str): The name of the dataset being used.
+            exec_cache_dir (str): Directory of the execution result cache. Empty to disable caching.
+            exec_cache_max_mb (int): Size bound of the execution result cache.
+            memory_limit_mb (int): Memory an execution can allocate, enforced in execution workers. 0 for no limit.
             **kwargs: Additional keyword arguments.
         """
         # TODO: remove task specific attributes so can parallel
@@ -51,12 +72,20 @@ class BaseCodeEnv:
         self.max_tests = max_display_tests
         self.max_chars = max_display_chars
         self.generic_code_env = False
+        self.exec_cache = None
+        if exec_cache_dir:
+            self.exec_cache = ExecutionCache(exec_cache_dir, max_bytes=exec_cache_max_mb * 2 ** 20)
+        self._test_set_id = None
+        self.memory_limit = (memory_limit_mb or 0) * 2 ** 20
+        self.task_test_stats = []
 
     def _reset(self, task):
         pass
         # raise NotImplementedError
 
     def reset(self, task):
+        self._test_set_id = None
+        self.task_test_stats = []
         self._reset(task)
         if 'public_test_list' in task:
             self.public_tests = task['public_test_list']
@@ -64,10 +93,66 @@ class BaseCodeEnv:
     def _step(self, full_code, use_public_tests=False):
         raise NotImplementedError
 
+    def get_test_set_id(self) -> str:
+        """
+        Identifies the tests of the current task, for caching step results.
+        Computed once per task from _test_set_parts.
+        """
+        if self._test_set_id is None:
+            self._test_set_id = make_cache_key(self.dataset_name, *self._test_set_parts())
+        return self._test_set_id
+
+    def _test_set_parts(self) -> tuple:
+        return self.test_prefix, self.private_tests, self.public_tests
+
+    def _exec_settings(self, use_public_tests: bool) -> tuple:
+        """
+        Settings that change the result of a step, for caching step results.
+        """
+        return use_public_tests, self.timeout, self.max_tests, self.max_chars, self.memory_limit
+
+    def _cached_step(self, full_code, use_public_tests=False):
+        if self.exec_cache is None:
+            return self._step(full_code, use_public_tests)
+        key = make_cache_key(
+            full_code,
+            self.get_test_set_id(),
+            self._exec_settings(use_public_tests),
+            type(self).__name__,
+            self.executor_version,
+        )
+        result = self.exec_cache.get(key)
+        if result is None:
+            result = self._step(full_code, use_public_tests)
+            if self._is_cacheable(result):
+                self.exec_cache.put(key, result)
+            return result
+        # the measurements are of the run that was cached
+        obs, reward, done, info = result
+        return obs, reward, done, {**info, 'test_stats': [], 'cached': True}
+
+    def _is_cacheable(self, result) -> bool:
+        """
+        Whether a step result can be reused, eg not if execution itself failed for transient reasons.
+        """
+        return True
+
     def step(self, full_code: str, use_public_tests: bool = False) -> Tuple[str, Union[bool, int, float], bool, Dict[str, Any]]:
         """
         Executes the given code against the test cases and generates feedback.
         """
-        obs, reward, done, info = self._step(full_code, use_public_tests)
+        obs, reward, done, info = self._cached_step(full_code, use_public_tests)
+        self.task_test_stats.extend(info.get('test_stats') or [])
         logger.info(f'obs: {obs}\nreward: {reward}\ndone: {done}\ninfo: {info}')
         return obs, reward, done, info
+
+    async def astep(self, full_code: str, use_public_tests: bool = False, executor: Optional[Executor] = None):
+        """
+        step for async agents: runs in executor (default: the event loop's), so the loop is not blocked
+        while the code executes. The context (eg the task being logged) is carried over.
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(
+            executor, functools.partial(ctx.run, self.step, full_code, use_public_tests)
+        )
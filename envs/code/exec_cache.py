@@ -0,0 +1,160 @@
+"""
+Content-addressed cache of code execution results.
+
+Agents often resubmit byte-identical code for a task (across attempts of a rollout, or across seeds),
+so env step results are stored on disk keyed by a hash of the code, the identity of the test set,
+the execution settings and the executor version. Storage is a SQLite database, so one cache can be
+shared by concurrent processes on a host. Total size is bounded, evicting least recently used entries.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from typing import Any, Optional
+
+from .executors.bounded_repr import repr_chunks
+
+logger = logging.getLogger("logger")
+
+
+def make_cache_key(*parts) -> str:
+    """
+    Hashes the parts (str, or anything with a deterministic repr) into a cache key.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, str) else repr(part)
+        h.update(data.encode('utf-8', errors='surrogatepass'))
+        # separator so ('ab', 'c') and ('a', 'bc') differ
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def make_content_key(*values) -> str:
+    """
+    Hashes the reprs of values (eg the inputs and expected outputs of a test set) into a key, rendering them
+    in chunks (see repr_chunks) so large values are never rendered in full. Sets are hashed in iteration order,
+    which for strings can differ between processes, giving a different (never a colliding) key.
+    """
+    h = hashlib.sha256()
+    for value in values:
+        for chunk in repr_chunks(value):
+            h.update(chunk.encode('utf-8', errors='surrogatepass'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class ExecutionCache:
+    """
+    Size-bounded LRU cache of pickled values in a SQLite database.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+        max_bytes (int): Bound on the total size of stored values.
+        hits (int): Number of lookups found in the cache, in this process.
+        misses (int): Number of lookups not found in the cache, in this process.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'exec_cache.sqlite')
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('total_size', 0)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread (and per process, connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the value stored under key, or None if absent.
+        """
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logger.error(f"Execution cache lookup failed: {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """
+        Stores value under key, then evicts least recently used entries if over max_bytes.
+        """
+        data = pickle.dumps(value)
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, data, len(data), time.time())
+                )
+                delta = len(data) - (old[0] if old else 0)
+                conn.execute("UPDATE meta SET value = value + ? WHERE name = 'total_size'", (delta,))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.error(f"Execution cache store failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        while total > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM entries ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'total_size'", (total,))
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters for this process and the size of the shared cache.
+        """
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'total_bytes': total,
+        }
+
+    def __deepcopy__(self, memo):
+        # connections cannot be copied, and the cache is meant to be shared anyway
+        return self
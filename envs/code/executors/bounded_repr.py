@@ -0,0 +1,116 @@
+"""
+Size-bounded rendering of values for test feedback.
+
+Feedback shows at most max_display_chars of each test and output, but MBPP+ inputs and outputs can be
+long lists or strings, whose full repr is megabytes. Here reprs are produced as a stream of chunks and
+rendering stops once the bound is passed, with the same result as rendering in full and truncating.
+"""
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+ELLIPSIS = '...'
+
+
+def _str_chunks(s: str, limit: Optional[int]) -> Iterator[str]:
+    if not limit or len(s) <= limit:
+        yield repr(s)
+        return
+    # each character's escape is independent of the rest, so a prefix of the string renders as a prefix of its repr,
+    # as long as the quotes are those repr picks for the whole string
+    quote = '"' if "'" in s and '"' not in s else "'"
+    prefix_repr = repr(s[:limit])
+    body = prefix_repr[1:-1]
+    if prefix_repr[0] != quote and quote == "'":
+        # the prefix has a ' and no ", which the whole string escapes as it also has a "
+        body = body.replace("'", "\\'")
+    # at least limit chars, so the closing quote is never reached
+    yield quote + body
+
+
+def _join_chunks(items, limit: Optional[int], sep: str = ', ') -> Iterator[str]:
+    for i, item in enumerate(items):
+        if i:
+            yield sep
+        yield from repr_chunks(item, limit)
+
+
+def repr_chunks(obj, limit: Optional[int] = None) -> Iterator[str]:
+    """
+    repr(obj) as a stream of chunks, rendering elements of builtin containers one at a time.
+    Strings longer than limit are rendered only up to limit chars (after which the stream is meant to be cut).
+    Subclasses and other types are rendered with their own repr.
+    """
+    obj_type = type(obj)
+    if obj_type is str:
+        yield from _str_chunks(obj, limit)
+    elif obj_type is list:
+        yield '['
+        yield from _join_chunks(obj, limit)
+        yield ']'
+    elif obj_type is tuple:
+        yield '('
+        yield from _join_chunks(obj, limit)
+        yield ',)' if len(obj) == 1 else ')'
+    elif obj_type is dict:
+        yield '{'
+        for i, (k, v) in enumerate(obj.items()):
+            if i:
+                yield ', '
+            yield from repr_chunks(k, limit)
+            yield ': '
+            yield from repr_chunks(v, limit)
+        yield '}'
+    elif obj_type in (set, frozenset) and obj:
+        yield '{' if obj_type is set else 'frozenset({'
+        yield from _join_chunks(obj, limit)
+        yield '}' if obj_type is set else '})'
+    else:
+        yield repr(obj)
+
+
+def bounded_join(chunks: Iterable[str], limit: Optional[int]) -> str:
+    """
+    Joins the chunks, consuming only as many as needed: if the result is longer than limit, its first limit
+    chars followed by '...'. No bound if limit is None (or 0, as max_display_chars).
+    """
+    if not limit:
+        return ''.join(chunks)
+    parts, size = [], 0
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return ''.join(parts)[:limit] + ELLIPSIS
+    return ''.join(parts)
+
+
+def bounded_repr(obj, limit: Optional[int]) -> str:
+    """
+    repr(obj), cut to limit chars followed by '...' if longer, without rendering past the cut.
+    """
+    return bounded_join(repr_chunks(obj, limit), limit)
+
+
+def bounded_str(obj, limit: Optional[int]) -> str:
+    """
+    str(obj), cut to limit chars followed by '...' if longer, without rendering past the cut for strings
+    and builtin containers (whose str is their repr).
+    """
+    if type(obj) is str:
+        return obj[:limit] + ELLIPSIS if limit and len(obj) > limit else obj
+    if type(obj) in (list, tuple, dict, set, frozenset):
+        return bounded_repr(obj, limit)
+    return bounded_join([str(obj)], limit)
+
+
+def bounded_call_assert(fn_name: str, args: list, expected, limit: Optional[int]) -> str:
+    """
+    The test `assert fn_name(*args)==expected` as source, cut as bounded_repr does.
+    """
+    chunks = chain(
+        ['assert ', fn_name, '('],
+        _join_chunks(args, limit),
+        [')=='],
+        repr_chunks(expected, limit),
+    )
+    return bounded_join(chunks, limit)
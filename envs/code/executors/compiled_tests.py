@@ -0,0 +1,246 @@
+"""
+APPS test cases compiled once per problem into the forms the output checks of run_test compare against.
+
+The official APPS checker re-parses the input_output JSON, deep-copies it and re-normalizes every
+expected output (joining, splitting into stripped lines, token sets, floats) for every solution,
+cascading through up to six comparisons. Here the expected side of each comparison is computed once
+per problem, so checking a solution's output only normalizes the solution's side, lazily, with the
+same verdicts (and the same expected output in the details) as the official cascade.
+
+A CompiledTestSet is treated as immutable: it is shared by copies of a datapoint, and by every
+solution evaluated against it.
+"""
+import json
+import threading
+
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional
+
+import numpy as np
+
+
+class CallTestCase(NamedTuple):
+    raw_input: Any  # as in the dataset, for details
+    args: list  # positional arguments, with JSON string keys of dicts converted back to int
+    expected: Any
+
+
+class StdioTestCase(NamedTuple):
+    raw_input: Any  # as in the dataset, for details
+    stdin: str  # lines joined into the stdin payload
+    expected: str  # lines joined into the expected stdout
+    expected_stripped: str
+    expected_lines: List[str]  # non-empty lines, stripped
+    expected_floats: Optional[List[float]]  # expected_lines as floats, None if not all numbers
+    expected_token_lines: List[set]  # token set of each of expected_lines
+    expected_tokens: frozenset  # all tokens, any other output token that is not a number cannot match
+    expected_token_sets: frozenset
+    expected_rounded_sets: Optional[frozenset]  # token sets rounded to 3 dp, None if not all numbers
+
+
+def _int_keys(x):
+    # JSON forces dictionaries to have string keys; this undoes this (assuming a singleton list)
+    try:
+        if isinstance(x[0], dict):
+            return [{int(k): v for k, v in x[0].items()}]
+    except Exception:
+        pass
+    return x
+
+
+def _expected_int_keys(x):
+    try:
+        if isinstance(x, dict):
+            x = [{int(k): v for k, v in x.items()}]
+    except Exception:
+        pass
+    return _int_keys(x)
+
+
+def _compile_stdio_case(inputs, outputs) -> StdioTestCase:
+    stdin = "\n".join(inputs) if isinstance(inputs, list) else inputs
+    expected = "\n".join(outputs) if isinstance(outputs, list) else outputs
+    expected_lines = [x.strip() for x in expected.split("\n") if x]
+    try:
+        expected_floats = [float(e) for e in expected_lines]
+    except ValueError:
+        expected_floats = None
+    expected_token_lines = [set(line.split()) for line in expected_lines]
+    try:
+        expected_rounded_sets = frozenset(
+            frozenset(round(float(t), 3) for t in s) for s in expected_token_lines
+        )
+    except (ValueError, OverflowError):
+        expected_rounded_sets = None
+    return StdioTestCase(
+        raw_input=inputs,
+        stdin=stdin,
+        expected=expected,
+        expected_stripped=expected.strip(),
+        expected_lines=expected_lines,
+        expected_floats=expected_floats,
+        expected_token_lines=expected_token_lines,
+        expected_tokens=frozenset(expected.split()),
+        expected_token_sets=frozenset(frozenset(s) for s in expected_token_lines),
+        expected_rounded_sets=expected_rounded_sets,
+    )
+
+
+class CompiledTestSet:
+    """
+    Pre-parsed and pre-normalized test cases of an APPS problem.
+
+    Attributes:
+        fn_name (str): Name of the function under test for call-based problems, None for standard input.
+        cases (tuple): CallTestCase or StdioTestCase per test, in order.
+    """
+    def __init__(self, fn_name: Optional[str], cases: tuple):
+        self.fn_name = fn_name
+        self.cases = cases
+
+    @property
+    def call_based(self) -> bool:
+        return self.fn_name is not None
+
+    def __len__(self):
+        return len(self.cases)
+
+    def __iter__(self):
+        return iter(self.cases)
+
+    def shard(self, num_shards: int) -> List['CompiledTestSet']:
+        """
+        Splits the cases into at most num_shards contiguous, non-empty test sets of near equal size,
+        in order, so results of the shards concatenate into the results of the whole set.
+        """
+        num_shards = max(1, min(num_shards, len(self.cases)))
+        size, extra = divmod(len(self.cases), num_shards)
+        shards, start = [], 0
+        for i in range(num_shards):
+            stop = start + size + (i < extra)
+            shards.append(CompiledTestSet(self.fn_name, self.cases[start:stop]))
+            start = stop
+        return shards
+
+    def __deepcopy__(self, memo):
+        # immutable, so copies of a datapoint can share it
+        return self
+
+
+def compile_test_set(in_outs: dict) -> CompiledTestSet:
+    """
+    Compiles the parsed input_output of an APPS problem. in_outs is not modified.
+    """
+    fn_name = in_outs.get("fn_name")
+    cases = []
+    for inputs, outputs in zip(in_outs["inputs"], in_outs["outputs"]):
+        args, expected = _int_keys(inputs), _expected_int_keys(outputs)
+        if fn_name is None:
+            cases.append(_compile_stdio_case(args, expected))
+        else:
+            cases.append(CallTestCase(raw_input=inputs, args=args, expected=expected))
+    return CompiledTestSet(fn_name, tuple(cases))
+
+
+# compiled test sets of the last problems loaded, keyed by problem id and the hash of their input_output,
+# so the JSON strings (several MB for some problems) are not kept alive
+_MAX_CACHED_TEST_SETS = 8
+_cached_test_sets = OrderedDict()
+_cached_test_sets_lock = threading.Lock()
+
+
+def load_compiled_test_set(input_output, problem_id=None) -> CompiledTestSet:
+    """
+    Compiled tests of an APPS problem from its input_output (JSON string or parsed dict).
+    With the problem id, compilations of JSON strings are cached for the last few problems, so a problem
+    is compiled once while it is being evaluated.
+    """
+    if isinstance(input_output, CompiledTestSet):
+        return input_output
+    if not isinstance(input_output, str):
+        return compile_test_set(input_output)
+    if problem_id is None:
+        return compile_test_set(json.loads(input_output))
+    key = (problem_id, len(input_output), hash(input_output))
+    with _cached_test_sets_lock:
+        test_set = _cached_test_sets.get(key)
+        if test_set is not None:
+            _cached_test_sets.move_to_end(key)
+            return test_set
+    test_set = compile_test_set(json.loads(input_output))
+    with _cached_test_sets_lock:
+        _cached_test_sets[key] = test_set
+        while len(_cached_test_sets) > _MAX_CACHED_TEST_SETS:
+            _cached_test_sets.popitem(last=False)
+    return test_set
+
+
+def compare_return(output, case: CallTestCase):
+    """
+    Checks the return value of a call-based solution, as the official cascade does.
+    May raise (eg on ambiguous numpy truth values), which the caller counts as a runtime error.
+    """
+    # ground truth sequences are not tuples
+    if isinstance(output, tuple):
+        output = list(output)
+    result = output == case.expected
+    if isinstance(case.expected, list) and case.expected:
+        result = result or (output == case.expected[0])
+    try:
+        if isinstance(output[0], tuple):
+            result = result or ([list(x) for x in output] == case.expected[0])
+    except Exception:
+        pass
+    return result
+
+
+def compare_stdout(output: List[str], case: StdioTestCase):
+    """
+    Checks the stdout lines of a standard input solution against the compiled expected output,
+    with the same verdict as the official cascade.
+
+    Returns:
+        tuple: (passed, the expected output in the form of the check that decided the verdict),
+            the latter being what the official checker reports in its details.
+    """
+    if "\n".join(output).strip() == case.expected_stripped:
+        return True, case.expected
+    if "\n".join(o.strip() for o in output).strip() == case.expected_stripped:
+        return True, case.expected
+
+    # line by line, ignoring surrounding whitespace of expected lines
+    if output == case.expected_lines:
+        return True, case.expected_lines
+    output = [o for o in output if o]
+    if output == case.expected_lines:
+        return True, case.expected_lines
+    if case.expected_floats is not None and len(output) == len(case.expected_floats):
+        try:
+            if np.allclose([float(e) for e in output], case.expected_floats):
+                return True, case.expected_lines
+        except ValueError:
+            pass
+
+    # as sets of tokens per line, ignoring line order
+    if not output and not case.expected_token_lines:
+        return True, case.expected_token_lines
+    token_lines = [line.split() for line in output]
+    token_lines = [tokens for tokens in token_lines if tokens]
+    result = set(frozenset(tokens) for tokens in token_lines) == case.expected_token_sets
+    if not result and case.expected_rounded_sets is not None:
+        # if they are all numbers, round so that similar numbers are treated as identical
+        try:
+            result = set(
+                frozenset(round(float(t), 3) for t in tokens) for tokens in token_lines
+            ) == case.expected_rounded_sets
+        except (ValueError, OverflowError):
+            pass
+    return result, case.expected_token_lines
+
+
+def is_number(token: str) -> bool:
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
@@ -1,10 +1,15 @@
-from typing import NamedTuple, List, Tuple
+from typing import NamedTuple, List, Tuple, Dict
 from abc import ABC, abstractmethod
 
 class ExecuteResult(NamedTuple):
     is_passing: bool
     feedback: str
     state: Tuple[bool]
+    # measurements (wall_time, cpu_time, peak_rss) of each test executed here (of the base and of the plus inputs
+    # for MBPP+, which are checked as a whole), see record_test_stats
+    test_stats: Tuple[Dict[str, float], ...] = ()
+    # whether a test timed out or took its worker down, so executing again may give another result
+    timed_out: bool = False
 
 class Executor(ABC):
     @abstractmethod
@@ -1,5 +1,10 @@
 # import os, json
+import io
+import resource
+import time
+
 from threading import Thread
+from typing import Optional
 
 
 class PropagatingThread(Thread):
@@ -45,6 +50,75 @@ def function_with_timeout(func, args, timeout):
 def timeout_handler(_, __):
     raise TimeoutError()
 
+
+# Memory measurement (Linux /proc, read with io.open as executors may replace builtins.open)
+def _read_proc_status_kb(field: str) -> Optional[int]:
+    try:
+        with io.open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """
+    Resets the peak RSS of this process to its current RSS, so get_peak_rss measures from now on.
+    Returns False if not supported, in which case get_peak_rss is the peak over the process lifetime.
+    """
+    try:
+        with io.open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss() -> int:
+    """
+    Peak resident set size of this process in bytes, since the last reset_peak_rss if supported.
+    """
+    peak_kb = _read_proc_status_kb('VmHWM:')
+    if peak_kb is None:
+        # ru_maxrss is in kB on Linux
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_kb * 1024
+
+
+def get_address_space_size() -> Optional[int]:
+    """
+    Virtual memory size of this process in bytes, which RLIMIT_AS applies to. None if unknown.
+    """
+    size_kb = _read_proc_status_kb('VmSize:')
+    return None if size_kb is None else size_kb * 1024
+
+
+# Per-test measurements
+def start_test_stats(test_stats: Optional[list]) -> tuple:
+    """
+    Starts measuring a test, to be passed to record_test_stats once it ends.
+    Peak RSS is only reset if test_stats is a list, ie measurements are wanted.
+    """
+    if test_stats is not None:
+        reset_peak_rss()
+    return time.perf_counter(), time.process_time()
+
+
+def record_test_stats(test_stats: Optional[list], test_start: tuple):
+    """
+    If test_stats is a list, appends the measurements of the test started at test_start:
+    wall_time and cpu_time (of this process) in seconds, and peak_rss in bytes.
+    """
+    if test_stats is not None:
+        wall_start, cpu_start = test_start
+        test_stats.append({
+            'wall_time': time.perf_counter() - wall_start,
+            'cpu_time': time.process_time() - cpu_start,
+            'peak_rss': get_peak_rss(),
+        })
+
 # def to_jsonl(dict_data, file_path):
 #     with open(file_path, 'a') as file:
 #         json_line = json.dumps(dict_data)
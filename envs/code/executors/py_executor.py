@@ -8,17 +8,28 @@ Modifications:
     - modules (eg pickle) that enable loading of files (these files can potentially be malicious)
     - os module which can access filesystem / reverse shell
 - so we modify the global variable to exec with a safer version
+- tests run in a pool of worker processes (see worker_pool.py), so runaway code is killed on timeout
 """
 import ast
+import functools
+import itertools
+import os
+import resource
+import signal
+import time
 import astunparse
 
-from typing import List
+from multiprocessing import Array, Value
+from typing import List, Optional, Tuple
 from RestrictedPython import safe_builtins, utility_builtins
-from evalplus.evaluate import check_correctness
+from evalplus.eval import FAIL as EVALPLUS_FAIL, PASS as EVALPLUS_PASS, TIMEOUT as EVALPLUS_TIMEOUT
+from evalplus.eval import _UNKNOWN, _mapping, unsafe_execute
 
-from .executor_utils import function_with_timeout
+from .bounded_repr import bounded_call_assert, bounded_join, bounded_str
+from .executor_utils import get_address_space_size, start_test_stats, record_test_stats
 from .executor_types import ExecuteResult, Executor
 from .humaneval_execution import swallow_io, create_tempdir
+from .worker_pool import WorkerPool, get_worker_pool, CRASHED, TIMEOUT
 
 from cognitive_base.utils import load_json
 from cognitive_base.utils.code_parse import whitelist_modules_path
@@ -78,33 +89,277 @@ def get_globals():
     return my_globals.copy()
 
 
-def get_test(tests, mbpp_plus_data, i):
+def warm_up_worker(memory_limit=None):
+    """
+    Initializer for MBPP execution workers. memory_limit (bytes) caps the memory tests can allocate
+    on top of the worker's own, via rlimits.
+    """
+    if memory_limit:
+        maximum_memory_bytes = (get_address_space_size() or 0) + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (maximum_memory_bytes, maximum_memory_bytes))
+
+
+# time limits of MBPP+ inputs, as in evalplus.evaluate.check_correctness
+MBPP_PLUS_MIN_TIME_LIMIT = 1
+MBPP_PLUS_GT_TIME_LIMIT_FACTOR = 4
+
+
+def get_mbpp_worker_pool(num_workers=None, max_jobs_per_worker=None, memory_limit=None) -> WorkerPool:
+    """
+    Returns the process-wide pool for MBPP executions, which run one test per job
+    (so workers are recycled after more jobs than APPS ones, which run a solution per job: 1000 if None).
+    memory_limit (bytes, 0 for none) caps the memory tests can allocate in a worker (see warm_up_worker);
+    None keeps the pool's current limit.
+    """
+    return get_worker_pool(
+        'mbpp',
+        num_workers=num_workers,
+        max_jobs_per_worker=1000 if max_jobs_per_worker is None else max_jobs_per_worker,
+        initializer=warm_up_worker,
+        initargs=None if memory_limit is None else (memory_limit or None,),
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(source: str, mode: str):
+    return compile(source, '<string>', mode)
+
+
+# globals with the function under test defined, reused by tests of the same execution in shared isolation
+_namespace = {'key': None, 'globals': None}
+
+
+def _define(func: str, namespace_key: Optional[str] = None) -> dict:
+    """
+    Globals with func defined, compiling func once per worker.
+    With a namespace_key, reuses the globals last defined for it in this worker, if any.
+    """
+    if namespace_key is not None and _namespace['key'] == namespace_key:
+        return _namespace['globals']
+    _namespace.update(key=None, globals=None)
+    globals_ = get_globals()
+    exec(_compile(f"from typing import *\n{func}", 'exec'), globals_)
+    if namespace_key is not None:
+        _namespace.update(key=namespace_key, globals=globals_)
+    return globals_
+
+
+def _test_namespace(func: str, namespace_key: Optional[str] = None) -> dict:
+    """
+    Namespace a test runs in: globals with func defined (see _define). With a namespace_key, a copy of the shared
+    globals, so names a test binds do not reach later tests (objects the code mutates still do).
+    The test runs with it as both globals and locals, so names it assigns are visible in its lambdas and generators.
+    """
+    globals_ = _define(func, namespace_key)
+    return globals_ if namespace_key is None else dict(globals_)
+
+
+def _run_test_job(func: str, test: str, assert_parts: Optional[Tuple[str, str]],
+                  namespace_key: Optional[str] = None, max_chars: Optional[int] = None):
+    """
+    Job run in a pool worker: defines func, then runs the test in the same globals.
+    With assert_parts (see split_assert), the call under test is evaluated once and its output
+    (or error message) captured for the feedback, so failing tests need not be run again.
+    With a namespace_key, func is defined once for all tests with that key, and each test runs in a copy
+    of its globals (see _test_namespace).
+
+    Returns:
+        tuple: Whether the test passed, its output as a string of at most max_chars (see bounded_str)
+            if it failed (None if not captured),
+            and its measurements (see record_test_stats).
+    """
+    test_stats = []
+    output = None
+    with create_tempdir():
+        with swallow_io():
+            test_start = start_test_stats(test_stats)
+            try:
+                if assert_parts is None:
+                    namespace = _test_namespace(func, namespace_key)
+                    exec(_compile(test, 'exec'), namespace)
+                else:
+                    call_str, check_str = assert_parts
+                    try:
+                        namespace = _test_namespace(func, namespace_key)
+                        output = eval(_compile(call_str, 'eval'), namespace)
+                    except Exception as e:
+                        # as get_output reports it
+                        output = str(e)
+                        raise
+                    namespace['_output'] = output
+                    exec(_compile(check_str, 'exec'), namespace)
+                passed = True
+            except Exception:
+                passed = False
+            record_test_stats(test_stats, test_start)
+            if passed or assert_parts is None:
+                return passed, None, test_stats[0]
+            try:
+                return passed, bounded_str(output, max_chars), test_stats[0]
+            except Exception as e:
+                return passed, str(e), test_stats[0]
+
+
+def _get_output_job(func: str, func_call: str, namespace_key: Optional[str] = None):
+    """
+    Job run in a pool worker: defines func (see _define), then evaluates func_call.
+    Returns the output, or the error message if either raised.
+    """
+    with create_tempdir():
+        with swallow_io():
+            try:
+                # this time, we need globals to persist as the execution is in 2 stages
+                e_globals = _test_namespace(func, namespace_key)
+                return eval(_compile(func_call, 'eval'), e_globals)
+            except Exception as e:
+                return str(e)
+
+
+def _call_job(func: str, fn_name: str, fn_input: list, max_chars: Optional[int] = None,
+              namespace_key: Optional[str] = None) -> str:
+    """
+    Job run in a pool worker: defines func (see _define), then calls fn_name on fn_input.
+    Returns the output (or the error message if either raised) as a string of at most max_chars (see bounded_str),
+    so large outputs are neither rendered in full nor sent back.
+    """
+    with create_tempdir():
+        with swallow_io():
+            try:
+                e_globals = _test_namespace(func, namespace_key)
+                if fn_name not in e_globals:
+                    raise NameError(f"name '{fn_name}' is not defined")
+                output = e_globals[fn_name](*fn_input)
+            except Exception as e:
+                output = str(e)
+            try:
+                return bounded_str(output, max_chars)
+            except Exception as e:
+                return str(e)
+
+
+def _get_mbpp_plus_test(mbpp_plus_data, i):
+    """
+    The function name, input and expected output of test i of an MBPP+ problem.
+    """
+    problem, expected_output = mbpp_plus_data
+    if i < len(problem['base_input']):
+        return problem['entry_point'], problem['base_input'][i], expected_output['base'][i]
+    j = i - len(problem['base_input'])
+    return problem['entry_point'], problem['plus_input'][j], expected_output['plus'][j]
+
+
+def _mbpp_plus_time_limits(ref_time: List[float]) -> Tuple[List[float], float]:
+    """
+    Time limits of MBPP+ inputs from the times of the ground truth, and the timeout of checking all of them,
+    as evalplus.eval.untrusted_check sets them.
+    """
+    time_limits = [max(MBPP_PLUS_MIN_TIME_LIMIT, MBPP_PLUS_GT_TIME_LIMIT_FACTOR * t) for t in ref_time]
+    return time_limits, min(float(os.getenv("EVALPLUS_TIMEOUT_PER_TASK", 60)), sum(time_limits)) + 2
+
+
+def _untrusted_check(code: str, inputs: list, entry_point: str, expected: list, atol, ref_time: List[float]):
+    """
+    evalplus.eval.untrusted_check from a pool worker: the inputs are checked by evalplus' unsafe_execute in a child
+    forked from the worker, so under its memory limit (see warm_up_worker), and measured when it is reaped.
+
+    Returns:
+        tuple: The evalplus status (PASS, FAIL or TIMEOUT), whether each input checked passed,
+            and the measurements of the child (as record_test_stats).
+    """
+    time_limits, timeout = _mbpp_plus_time_limits(ref_time)
+    # shared with the child
+    progress, stat = Value("i", 0, lock=False), Value("i", _UNKNOWN, lock=False)
+    details = Array("b", [False] * len(inputs), lock=False)
+    wall_start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # evalplus sets its own limit, which cannot exceed the worker's
+            _, max_memory = resource.getrlimit(resource.RLIMIT_AS)
+            if max_memory != resource.RLIM_INFINITY:
+                os.environ["EVALPLUS_MAX_MEMORY_BYTES"] = str(max_memory)
+            unsafe_execute(
+                "mbpp", entry_point, code, inputs, expected, time_limits, atol, False, stat, details, progress
+            )
+        finally:
+            os._exit(0)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        waited_pid, _, rusage = os.wait4(pid, os.WNOHANG)
+        if waited_pid:
+            break
+        if time.monotonic() > deadline:
+            os.kill(pid, signal.SIGKILL)
+            _, _, rusage = os.wait4(pid, 0)
+            break
+        time.sleep(0.002)
+    stats = {
+        'wall_time': time.perf_counter() - wall_start,
+        'cpu_time': rusage.ru_utime + rusage.ru_stime,
+        # ru_maxrss is in kB on Linux
+        'peak_rss': rusage.ru_maxrss * 1024,
+    }
+    status = _mapping[stat.value] or EVALPLUS_TIMEOUT
+    details = list(details[:progress.value])
+    if status == EVALPLUS_PASS and (len(details) != len(inputs) or not all(details)):
+        status = EVALPLUS_FAIL
+    return status, details, stats
+
+
+def _mbpp_plus_check_job(mbpp_plus_data, code: str):
+    """
+    Job run in a pool worker: checks code on the base, then the plus inputs of an MBPP+ problem,
+    as evalplus.evaluate.check_correctness does (see _untrusted_check).
+
+    Returns:
+        tuple: {'base': ..., 'plus': ...} of (status, whether each input passed), and the measurements of both.
+    """
+    problem, expected_output = mbpp_plus_data
+    ret, test_stats = {}, []
+    for part in ('base', 'plus'):
+        status, details, stats = _untrusted_check(
+            code, problem[f'{part}_input'], problem['entry_point'], expected_output[part], problem['atol'],
+            expected_output[f'{part}_time'],
+        )
+        ret[part] = (status, details)
+        test_stats.append(stats)
+    return ret, test_stats
+
+
+def get_test(tests, mbpp_plus_data, i, max_chars: Optional[int] = None):
+    """
+    Test i as source, cut to max_chars followed by '...' if longer.
+    MBPP+ tests are rendered from their input and output, only up to the cut (see bounded_call_assert).
+    """
     if mbpp_plus_data:
-        if i < len(mbpp_plus_data[0]['base_input']):
-            fn_input = mbpp_plus_data[0]['base_input'][i]
-            fn_output = mbpp_plus_data[1]['base'][i]
-        else:
-            j = i - len(mbpp_plus_data[0]['base_input'])
-            fn_input = mbpp_plus_data[0]['plus_input'][j]
-            fn_output = mbpp_plus_data[1]['plus'][j]
-        return f"assert {mbpp_plus_data[0]['entry_point']}({repr(fn_input)[1:-1]})=={repr(fn_output)}"
+        return bounded_call_assert(*_get_mbpp_plus_test(mbpp_plus_data, i), max_chars)
     else:
-        return tests[i]
+        return bounded_join([tests[i]], max_chars)
+
+
+_execution_ids = itertools.count()
 
 
 class PyExecutor(Executor):
-    def __init__(self, max_display_tests=None, max_display_chars=None):
+    def __init__(self, max_display_tests=None, max_display_chars=None, pool: WorkerPool = None,
+                 isolation: str = 'fresh'):
         # truncate incase output is long.
         # since we usually care about passing all test cases, can use this to early stop if too many mistakes
         self.max_tests = max_display_tests
         self.max_chars = max_display_chars
+        # tests run in worker processes, so ones that time out can be killed rather than left running
+        self.pool = pool if pool is not None else get_mbpp_worker_pool()
+        # 'fresh': the function is defined again for every test, so no state leaks between tests.
+        # 'shared': the function is defined once per execution and each test runs in a copy of its globals.
+        # faster for code with costly setup, but objects the code mutates (module-level lists, mutable default
+        # arguments) carry over between tests, so verdicts can differ from 'fresh'
+        if isolation not in ('shared', 'fresh'):
+            raise ValueError(f"Unknown test isolation: {isolation}")
+        self.isolation = isolation
 
     def execute(self, func: str, tests: List[str], timeout: int = 5, mbpp_plus_data: tuple = (),
                 use_public_tests: bool = False) -> ExecuteResult:
-        # Combine function code and assert statement
-        imports = 'from typing import *'
-        func_test_list = [f'{imports}\n{func}\n{test}' for test in tests]
-
         # Run the tests and collect the results
         # success_tests = []
         # failed_tests = []
@@ -112,47 +367,54 @@ class PyExecutor(Executor):
         failed_test_idxs = []
         failed_test_outputs = []
         is_passing = True
-        num_tests = len(func_test_list)
+        timed_out = False
+        num_tests = len(tests)
+        test_stats = []
         if mbpp_plus_data:
-            ret = check_correctness(
-                "mbpp",
-                0,
-                mbpp_plus_data[0],
-                func,
-                mbpp_plus_data[1],
-                False,
-                min_time_limit=1,
-                gt_time_limit_factor=4
-                )
-            # print('done')
-            res = ret['base'][1] + ret['plus'][1]
+            res, timed_out, test_stats = self._check_mbpp_plus(func, mbpp_plus_data)
+
+        namespace_key = None
+        if self.isolation == 'shared':
+            namespace_key = f"{os.getpid()}-{next(_execution_ids)}"
 
         state = []
         for i in range(num_tests):
             # print(i)
             # print(res[i])
-            with create_tempdir():
-                with swallow_io():
-                    try:
-                        if mbpp_plus_data:
-                            assert res[i] == 1
-                        else:
-                            function_with_timeout(exec, (func_test_list[i], get_globals()), timeout)
-                        # success_tests += [tests[i]]
-                        if self.max_tests and len(success_test_idxs) < self.max_tests:
-                            success_test_idxs.append(i)
-                        state.append(True)
-                    except Exception:
-                        test = get_test(tests, mbpp_plus_data, i)
-                        output = get_output(func, test, timeout=timeout)
-                        # output = ''
-                        # failed_tests += [f"{tests[i]} # output: {output}"]
-                        failed_test_idxs.append(i)
-                        failed_test_outputs.append(output)
-                        is_passing = False
-                        state.append(False)
-                        if self.max_tests and len(failed_test_idxs) >= self.max_tests:
-                            break
+            if mbpp_plus_data:
+                passed = i < len(res) and res[i] == 1
+            else:
+                assert_parts = split_assert(tests[i])
+                job = self.pool.run(
+                    _run_test_job, (func, tests[i], assert_parts, namespace_key, self.max_chars), timeout=timeout
+                )
+                if job.ok:
+                    passed, output, stats = job.value
+                else:
+                    passed, stats = False, {'wall_time': job.elapsed}
+                    timed_out = timed_out or job.status in (TIMEOUT, CRASHED)
+                    # the call under test is what timed out, as it would again in get_output
+                    output = "TIMEOUT" if job.status == TIMEOUT and assert_parts is not None else None
+                # a test that timed out or took its worker down has only its wall time
+                test_stats.append(stats)
+            if passed:
+                # success_tests += [tests[i]]
+                if self.max_tests and len(success_test_idxs) < self.max_tests:
+                    success_test_idxs.append(i)
+                state.append(True)
+            else:
+                if mbpp_plus_data:
+                    output = self._get_mbpp_plus_output(func, mbpp_plus_data, i, timeout, namespace_key)
+                elif output is None:
+                    output = get_output(func, tests[i], timeout=timeout, pool=self.pool, namespace_key=namespace_key)
+                # output = ''
+                # failed_tests += [f"{tests[i]} # output: {output}"]
+                failed_test_idxs.append(i)
+                failed_test_outputs.append(output)
+                is_passing = False
+                state.append(False)
+                if self.max_tests and len(failed_test_idxs) >= self.max_tests:
+                    break
 
         # for test in tests:
         #     if test in success_tests:
@@ -167,9 +429,7 @@ class PyExecutor(Executor):
         # for test in success_tests:
         #     feedback += f"\n{test}"
         for idx in success_test_idxs:
-            test_str = get_test(tests, mbpp_plus_data, idx)
-            if self.max_chars and len(test_str) > self.max_chars:
-                test_str = test_str[:self.max_chars] + '...'
+            test_str = get_test(tests, mbpp_plus_data, idx, self.max_chars)
             feedback += f"\n{test_str}"
         if not success_test_idxs:
             feedback += f"\nNone"
@@ -177,17 +437,45 @@ class PyExecutor(Executor):
         # for test in failed_tests:
         #     feedback += f"\n{test}"
         for i, test_idx in enumerate(failed_test_idxs):
-            test_str = get_test(tests, mbpp_plus_data, test_idx)
-            output_str = str(failed_test_outputs[i])
-            if self.max_chars:
-                if len(test_str) > self.max_chars:
-                    test_str = test_str[:self.max_chars] + '...'
-                if len(output_str) > self.max_chars:
-                    output_str = output_str[:self.max_chars] + '...'
+            test_str = get_test(tests, mbpp_plus_data, test_idx, self.max_chars)
+            output_str = bounded_str(failed_test_outputs[i], self.max_chars)
             feedback += f"\n{f'{test_str} # output: {output_str}'}"
         if not failed_test_idxs:
             feedback += "\nNone"
-        return ExecuteResult(is_passing, feedback, state)
+        return ExecuteResult(is_passing, feedback, state, tuple(test_stats), timed_out)
+
+    def _check_mbpp_plus(self, func, mbpp_plus_data):
+        """
+        Checks func on the inputs of an MBPP+ problem in a pool worker (see _mbpp_plus_check_job), the problem
+        being sent once per worker.
+
+        Returns:
+            tuple: Whether each input passed (base then plus, up to the first that timed out), whether
+                an input timed out, and the measurements of the base and of the plus inputs.
+        """
+        problem, expected_output = mbpp_plus_data
+        # the worker enforces the timeout of each part, this one only catches a worker that stops responding
+        timeout = sum(_mbpp_plus_time_limits(expected_output[f'{part}_time'])[1] for part in ('base', 'plus')) + 1
+        job = self.pool.run(
+            _mbpp_plus_check_job, (func,), timeout=timeout,
+            payload=(('mbpp_plus', problem['task_id']), mbpp_plus_data),
+        )
+        if not job.ok:
+            return [], True, [{'wall_time': job.elapsed}]
+        ret, test_stats = job.value
+        timed_out = EVALPLUS_TIMEOUT in (ret['base'][0], ret['plus'][0])
+        return ret['base'][1] + ret['plus'][1], timed_out, test_stats
+
+    def _get_mbpp_plus_output(self, func, mbpp_plus_data, i, timeout, namespace_key):
+        """
+        Output of func on the input of MBPP+ test i for the feedback, called on the input itself
+        rather than on a rendered test, and rendered in the worker up to max_chars.
+        """
+        fn_name, fn_input, _ = _get_mbpp_plus_test(mbpp_plus_data, i)
+        job = self.pool.run(_call_job, (func, fn_name, fn_input, self.max_chars, namespace_key), timeout=timeout)
+        if job.status == TIMEOUT:
+            return "TIMEOUT"
+        return job.value if job.ok else str(job.value)
 
     def evaluate(self, name: str, func: str, test: str, timeout: int = 5) -> bool:
         """
@@ -210,6 +498,7 @@ check({name})
         #     return False
 
 
+@functools.lru_cache(maxsize=4096)
 def get_call_str(assert_statement: str) -> str:
     ast_parsed = ast.parse(assert_statement)
     try:
@@ -220,18 +509,43 @@ def get_call_str(assert_statement: str) -> str:
     return astunparse.unparse(call_str).strip()
 
 
-def get_output(func: str, assert_statement: str, timeout: int = 5) -> str:
+@functools.lru_cache(maxsize=4096)
+def split_assert(assert_statement: str) -> Optional[Tuple[str, str]]:
+    """
+    Splits a test that is a single assert into the call whose output is reported on failure
+    (see get_call_str), and the assert with that call replaced by the name `_output`.
+    None if the test is anything else, in which case it runs as is.
+    """
+    try:
+        ast_parsed = ast.parse(assert_statement)
+        if len(ast_parsed.body) != 1 or not isinstance(ast_parsed.body[0], ast.Assert):
+            return None
+        call_str = get_call_str(assert_statement)
+    except Exception:
+        return None
+    node = ast_parsed.body[0]
+    output_name = ast.Name(id='_output', ctx=ast.Load())
+    if hasattr(node.test, 'left'):
+        node.test.left = output_name
+    else:
+        node.test = output_name
+    return call_str, astunparse.unparse(node).strip()
+
+
+def get_output(func: str, assert_statement: str, timeout: int = 5, pool: WorkerPool = None,
+               namespace_key: Optional[str] = None) -> str:
     try:
-        # this time, we need globals to persist as the execution is in 2 stages
-        e_globals = get_globals()
-        exec(f"from typing import *\n{func}", e_globals)
         func_call = get_call_str(assert_statement)
-        output = function_with_timeout(eval, (func_call, e_globals), timeout)
-        return output
-    except TimeoutError:
-        return "TIMEOUT"
     except Exception as e:
         return str(e)
+    pool = pool if pool is not None else get_mbpp_worker_pool()
+    job = pool.run(_get_output_job, (func, func_call, namespace_key), timeout=timeout)
+    if job.status == TIMEOUT:
+        return "TIMEOUT"
+    if not job.ok:
+        # eg SystemExit, or an output that cannot be sent back
+        return str(job.value)
+    return job.value
 
 
 if __name__ == "__main__":
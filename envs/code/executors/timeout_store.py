@@ -0,0 +1,112 @@
+"""
+Per-problem test timeouts, measured from reference solutions and persisted so later runs reuse them.
+
+A fixed timeout wastes seconds on every infinite loop for fast problems and is too tight for slow ones,
+so a problem's budget is set to a multiple of its reference solution's slowest test.
+"""
+import fcntl
+import json
+import logging
+import os
+import tempfile
+
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("logger")
+
+
+def adaptive_timeout(
+    ref_times: List[float],
+    factor: float = 4.0,
+    min_timeout: float = 0.25,
+    max_timeout: float = 4.0,
+) -> float:
+    """
+    Time limit per test from the reference solution's test times.
+
+    Args:
+        ref_times (list): Wall times in seconds of the reference solution on each test.
+        factor (float): Multiple of the slowest reference test allowed.
+        min_timeout (float): Floor, to absorb scheduling noise on very fast tests.
+        max_timeout (float): Ceiling.
+
+    Returns:
+        float: The per-test timeout in seconds.
+    """
+    slowest = max(ref_times, default=0)
+    return min(max_timeout, max(min_timeout, factor * slowest))
+
+
+class TimeoutStore:
+    """
+    JSON-backed mapping of problem id to per-test timeout in seconds.
+    set only updates memory, and flush merges the new timeouts with the file on disk under a lock and writes
+    it once, so recording many problems costs one write and concurrent processes can share a store.
+    The file is read on first use, so a store opened before its timeouts are measured still sees them.
+
+    Attributes:
+        path (str): Path of the JSON file.
+        timeouts (dict): The timeouts known so far, keyed by str(problem_id).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._timeouts: Optional[Dict[str, float]] = None
+        # set since the last flush
+        self._pending: Dict[str, float] = {}
+
+    @property
+    def timeouts(self) -> Dict[str, float]:
+        if self._timeouts is None:
+            self._timeouts = self._load()
+        return self._timeouts
+
+    def _load(self) -> Dict[str, float]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error(f"Failed to load timeout store {self.path}: {e}")
+            return {}
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path + '.lock', 'w') as lock_f:
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+    def get(self, problem_id, default: Optional[float] = None) -> Optional[float]:
+        return self.timeouts.get(str(problem_id), default)
+
+    def set(self, problem_id, seconds: float):
+        """
+        Records the timeout for a problem, written to disk on flush.
+        """
+        self.timeouts[str(problem_id)] = seconds
+        self._pending[str(problem_id)] = seconds
+
+    def flush(self):
+        """
+        Writes the timeouts set since the last flush, merged with those other processes wrote meanwhile.
+        """
+        if not self._pending:
+            return
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dirname, exist_ok=True)
+        with self._locked():
+            self._timeouts = {**self.timeouts, **self._load(), **self._pending}
+            with tempfile.NamedTemporaryFile('w', dir=dirname, delete=False) as f:
+                json.dump(self._timeouts, f, indent=4)
+            os.replace(f.name, self.path)
+        self._pending = {}
+
+    def __contains__(self, problem_id):
+        return str(problem_id) in self.timeouts
+
+    def __len__(self):
+        return len(self.timeouts)
@@ -33,78 +33,204 @@ import contextlib
 import pdb
 
 import logging
-from .utils_execute import run_test
+from .utils_execute import run_test, warm_up_worker
+from .compiled_tests import load_compiled_test_set
+from .worker_pool import WorkerPool, get_worker_pool, TIMEOUT
 
 logger = logging.getLogger("logger")
 
 GLOBAL_TIMEOUT = 10  # TIMEOUT for one solution
 
 
-def safe_eval_answer_from_agent(example, debug=False, return_output=False):
-    def _temp_run(code, tests, result, details, debug=False, return_output=False):
-        try:
-            if not return_output:
-                flag, outcomes = verify_code_official(tests, code, debug=debug, return_output=return_output)
-                details.append(outcomes)
-                # print(outcomes)
-            else:
-                flag, outcomes, all_outputs = verify_code_official(tests, code, debug=debug,
-                                                                   return_output=return_output)
-                details.append((outcomes, all_outputs))
-                # print(res)
-                # if not flag:
-                # if len(res) > 1 and not flag:
-                #     print(f'all_outputs \n {all_outputs}\n')
-                #     print(f'res:\n{res}\n')
-            result.append(flag)
-            # print(flag)
-        except Exception as e:
-            error_msg = (f"Error in execution _temp_run\n"
-                         f"The error message is:\n  {str(e)}, {type(e).__name__}\n")
-            logger.error(error_msg)
+def get_apps_worker_pool(num_workers=None, max_jobs_per_worker=None, zygote=None, memory_limit=None) -> WorkerPool:
+    """
+    Returns the process-wide pool for APPS executions. Workers pre-import the APPS prelude and
+    apply reliability_guard on start. With zygote, each execution runs in a child forked from a
+    warm worker instead of in the worker itself. memory_limit (bytes, 0 for none) caps the memory
+    solutions can allocate in a worker (see warm_up_worker); None keeps the pool's current limit.
+    """
+    return get_worker_pool(
+        'apps',
+        num_workers=num_workers,
+        max_jobs_per_worker=max_jobs_per_worker,
+        initializer=warm_up_worker,
+        initargs=None if memory_limit is None else (memory_limit or None,),
+        fork_per_job=zygote,
+    )
 
-    example['gpt_pass_flags'] = []
+
+def _temp_run(code, tests, debug=False, return_output=False, fail_fast=False, test_timeout=None):
+    """
+    Job run in a pool worker.
+    Returns (flag, details entry, number of skipped tests, per-test stats), or None on error.
+    """
     try:
-        if type(example['input_output']) == str:
-            tests = json.loads(example['input_output'])
+        test_stats = []
+        if not return_output:
+            flag, outcomes = verify_code_official(tests, code, debug=debug, return_output=return_output,
+                                                  fail_fast=fail_fast, test_timeout=test_timeout,
+                                                  test_stats=test_stats)
+            details = outcomes
         else:
-            tests = example['input_output']
+            flag, outcomes, all_outputs = verify_code_official(tests, code, debug=debug,
+                                                               return_output=return_output, fail_fast=fail_fast,
+                                                               test_timeout=test_timeout, test_stats=test_stats)
+            details = (outcomes, all_outputs)
+        num_skipped = max(0, len(tests) - len(outcomes)) if fail_fast else 0
+        return flag, details, num_skipped, test_stats
+    except Exception as e:
+        error_msg = (f"Error in execution _temp_run\n"
+                     f"The error message is:\n  {str(e)}, {type(e).__name__}\n")
+        logger.error(error_msg)
+        return None
+
+
+def _temp_run_on_payload(tests, code, *args):
+    """
+    _temp_run as a job whose tests are a payload kept by the worker (see WorkerPool.run).
+    """
+    return _temp_run(code, tests, *args)
+
+
+def _merge_shard_results(shard_results, num_tests, return_output=False, fail_fast=False):
+    """
+    Merges the _temp_run results of the shards of a test set (see CompiledTestSet.shard), in order,
+    into the result of running the whole test set at once. None if any shard failed to run.
+    """
+    if any(result is None for result in shard_results):
+        return None
+    outcomes, all_outputs, test_stats = [], [], []
+    for _, details, _, stats in shard_results:
+        shard_outcomes, shard_outputs = details if return_output else (details, [])
+        if -2 in shard_outcomes:
+            # compile error, which every shard reports the same way, instead of per-test results
+            outcomes, all_outputs, test_stats = shard_outcomes, shard_outputs, stats
+            break
+        outcomes += shard_outcomes
+        all_outputs += shard_outputs
+        test_stats += stats
+        if fail_fast and any(res != True for res in shard_outcomes):
+            # a serial run would have stopped in this shard
+            break
+    flag = all(res == True for res in outcomes)
+    details = (outcomes, all_outputs) if return_output else outcomes
+    num_skipped = max(0, num_tests - len(outcomes)) if fail_fast else 0
+    return flag, details, num_skipped, test_stats
+
+
+def safe_eval_answer_from_agent(example, debug=False, return_output=False, pool: WorkerPool = None,
+                                num_workers: int = None, fail_fast: bool = False, test_timeout: float = None,
+                                num_shards: int = 1, tests_key: str = None):
+    """
+    Evaluates each code in example['gpt_codes'] against the tests in example['input_output'].
+
+    Codes run in a persistent pool of worker processes (see worker_pool.py) rather than a fresh
+    process per code. A code that times out, crashes its worker or errors gets a False pass flag
+    and no entry in example['details'].
+
+    Args:
+        example (dict): APPS datapoint with 'input_output' and 'gpt_codes', and optionally 'compiled_tests'
+            (the CompiledTestSet of input_output, see compiled_tests.py) to skip parsing the tests.
+        debug (bool): Print debugging info during execution.
+        return_output (bool): Include execution outputs in details.
+        pool (WorkerPool, optional): Pool to submit to. Defaults to the process-wide APPS pool.
+        num_workers (int, optional): Number of codes to evaluate concurrently, eg when scoring n samples for
+            pass@k. Defaults to, and is capped by, the size of the pool, which is set from config
+            (--num_exec_workers, see get_apps_worker_pool). Results are in the order of example['gpt_codes'].
+        fail_fast (bool): Stop each code at its first failing test, when only the verdict is needed.
+            The number of tests not run is recorded in example['skipped_tests'], aligned with details.
+        test_timeout (float, optional): Time limit in seconds per test. Defaults to example['test_timeout']
+            if set (eg a measured per-problem budget), else the runner's default.
+        num_shards (int): Split the tests of each code into up to num_shards contiguous shards that run as
+            separate jobs, in parallel up to the size of the pool, for problems with many slow tests.
+            Results are merged back in test order, as if the tests ran in one job (with fail_fast, tests
+            after the first failing shard may run but are dropped). Each shard compiles the code again.
+        tests_key (str, optional): Identifies the tests of the example (eg BaseCodeEnv.get_test_set_id), so
+            workers keep them between calls and they are sent to each worker once, rather than with every code.
+
+    Returns:
+        dict: The example, with 'gpt_pass_flags', 'details', 'skipped_tests' and 'test_stats'
+            (per-test measurements, see record_test_stats, aligned with details) filled in.
+    """
+    example['gpt_pass_flags'] = []
+    try:
+        tests = example.get('compiled_tests') or load_compiled_test_set(
+            example['input_output'], example.get('problem_id'))
     except:
         print(f"Failed to get unit tests for problem {example['problem_id']} with {example['input_output']}")
         return example
 
+    if pool is None:
+        pool = get_apps_worker_pool()
+    test_timeout = test_timeout or example.get('test_timeout')
     example['details'] = []
-    for code in example['gpt_codes']:
-        manager = multiprocessing.Manager()
-        result = manager.list()
-        details = manager.list()
-        start = time.time()
-        p = multiprocessing.Process(target=_temp_run, args=(code, tests, result, details, debug, return_output))
-        p.start()
-        p.join(timeout=GLOBAL_TIMEOUT + 1)
-        time_used = time.time() - start
-        if p.is_alive():
-            p.kill()
-        if not result:
-            result = [-1]
+    example['skipped_tests'] = []
+    example['test_stats'] = []
+    shards = tests.shard(num_shards) if num_shards > 1 else [tests]
+    if tests_key is None:
+        jobs = pool.map(
+            _temp_run,
+            [
+                (code, shard, debug, return_output, fail_fast, test_timeout)
+                for code in example['gpt_codes'] for shard in shards
+            ],
+            timeout=GLOBAL_TIMEOUT + 1,
+            max_concurrency=(num_workers or pool.num_workers) * len(shards),
+        )
+    else:
+        jobs = pool.map(
+            _temp_run_on_payload,
+            [
+                (code, debug, return_output, fail_fast, test_timeout)
+                for code in example['gpt_codes'] for _ in shards
+            ],
+            timeout=GLOBAL_TIMEOUT + 1,
+            max_concurrency=(num_workers or pool.num_workers) * len(shards),
+            payloads=[
+                (f"{tests_key}-{i}/{len(shards)}", shard) for _ in example['gpt_codes'] for i, shard in enumerate(shards)
+            ],
+        )
+    for i in range(len(example['gpt_codes'])):
+        shard_results = []
+        for job in jobs[i * len(shards):(i + 1) * len(shards)]:
+            if job.status == TIMEOUT:
+                logger.info(f"execution timed out after {job.elapsed:.1f}s")
+            shard_results.append(job.value if job.ok else None)
+        if len(shards) == 1:
+            result = shard_results[0]
+        else:
+            result = _merge_shard_results(shard_results, len(tests), return_output, fail_fast)
+        if result is None:
+            result = (-1, None, 0, [])
 
         if result[0] == True:
             example['gpt_pass_flags'] += [True]
         else:
             example['gpt_pass_flags'] += [False]
-        example['details'] += deepcopy(details)
+        if result[1] is not None:
+            example['details'].append(result[1])
+            example['skipped_tests'].append(result[2])
+            example['test_stats'].append(result[3])
 
     return example
 
 
-def verify_code_official(tests, solution, debug=False, return_output=False):
+class DiscardingStdout(io.TextIOBase):
+    def write(self, s):
+        return len(s)
+
+
+def verify_code_official(tests, solution, debug=False, return_output=False, fail_fast=False,
+                         test_timeout=None, test_stats=None):
     ''' verify if code passes all tests, using apps official implementation (https://github.com/hendrycks/apps/blob/main/eval/testing_util.py#L122)
+    with fail_fast, stops at the first failing test (the verdict is the same, results may be shorter)
+    tests can be parsed input_output or a CompiledTestSet, neither is modified
     '''
-    tests = deepcopy(tests)
-    # suppress the stdout of solution execution
+    # suppress the stdout of solution execution, discarding it so chatty solutions cannot use up memory
     # todo: suppress stderr as well
-    with contextlib.redirect_stdout(io.StringIO()):
-        results = run_test(tests, solution, debug=debug, return_output=return_output)
+    with contextlib.redirect_stdout(DiscardingStdout()):
+        results = run_test(tests, solution, debug=debug, return_output=return_output, fail_fast=fail_fast,
+                           test_timeout=test_timeout, test_stats=test_stats)
         # original_results = results
         if return_output:
             all_outputs = results[1]
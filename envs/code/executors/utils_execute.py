@@ -20,12 +20,16 @@ import numpy as np
 from io import StringIO
 from typing import get_type_hints
 from typing import List, Tuple, Dict
-# used for testing the code that reads from input
-from unittest.mock import patch, mock_open
+import builtins
+import codecs
+import re
 
 from pyext import RuntimeModule
 import copy 
 
+from .compiled_tests import load_compiled_test_set, compare_return, compare_stdout, is_number
+from .executor_utils import get_address_space_size, start_test_stats, record_test_stats
+
 from enum import Enum
 import contextlib
 
@@ -41,15 +45,37 @@ def timeout_handler(signum, frame):
     #return
     raise TimeoutException
 signal.signal(signal.SIGALRM, timeout_handler)
-timeout = 4  # seconds
+timeout = 4  # default seconds per test, can be overridden per problem (fractions allowed)
+output_limit = 1 << 24  # default max bytes of stdout per test, raised for tests expecting more
+
+# outcome of a test whose stdout went over the output limit
+OUTPUT_LIMIT_EXCEEDED = -3
+
+
+# BaseException, so solutions catching Exception do not swallow it
+class OutputStopped(BaseException):
+    pass
+class OutputLimitExceeded(OutputStopped):
+    pass
+class OutputMismatch(OutputStopped):
+    pass
+
+# imports prepended to every solution
+APPS_PRELUDE = "import sys\nimport time\nimport itertools\nfrom itertools import accumulate, product, permutations, combinations\nimport collections\nfrom collections import Counter, OrderedDict, deque, defaultdict, ChainMap\nfrom functools import lru_cache\nimport math\nfrom math import sqrt, sin, cos, tan, ceil, fabs, floor, gcd, exp, log, log2\nimport fractions\nfrom typing import List, Tuple\nimport numpy as np\nimport random\nimport heapq\nfrom heapq import *\n"
 
 # used to capture stdout as a list
 # from https://stackoverflow.com/a/16571630/6416660
 # alternative use redirect_stdout() from contextlib
 class Capturing(list):
+    def __init__(self, buffer=None):
+        # buffer: a StringIO to reuse, already reset (eg StdioHarness.stdout), else a new one is made
+        super().__init__()
+        self._buffer = buffer
+
     def __enter__(self):
         self._stdout = sys.stdout
-        sys.stdout = self._stringio = StringIO()
+        self._stringio = StringIO() if self._buffer is None else self._buffer
+        sys.stdout = self._stringio
         # Make closing the StringIO a no-op
         self._stringio.close = lambda x: 1
         return self
@@ -59,6 +85,222 @@ class Capturing(list):
         sys.stdout = self._stdout
 
 
+class OutputSink(io.RawIOBase):
+    """
+    Bytes written to a BoundedStdout, in chunks of its buffer size. While armed (ie while the solution runs),
+    stops the solution by raising OutputStopped as soon as the output goes over a byte limit, or contains
+    a token that cannot match the expected output (one that is not an expected token, nor a number that
+    could match one after rounding). Once stopped, further writes raise while armed, and are dropped otherwise.
+
+    Attributes:
+        limit (int): Max bytes of output.
+        expected_tokens (frozenset): Tokens of the expected output, None to not check tokens.
+        stopped (type): OutputLimitExceeded or OutputMismatch once output was stopped, else None.
+        armed (bool): Whether writes are limited and checked.
+    """
+    max_token_len = 1 << 12  # longer tokens are not checked
+
+    def __init__(self):
+        super().__init__()
+        self.armed = False
+        self.reset()
+
+    def reset(self, limit=None, expected_tokens=None):
+        self.limit = limit or output_limit
+        self.expected_tokens = expected_tokens
+        self.stopped = None
+        self._chunks = []
+        self._size = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')('surrogatepass')
+        self._partial = ""
+        self._in_long_token = False
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        n = len(b)
+        if self.stopped is not None:
+            if self.armed:
+                raise self.stopped()
+            return n
+        if self.armed and self._size + n > self.limit:
+            self._stop(OutputLimitExceeded)
+        self._chunks.append(bytes(b))
+        self._size += n
+        if self.armed and self.expected_tokens is not None:
+            # kept even on a mismatch, to show in the feedback
+            self._check_tokens(self._decoder.decode(b))
+        return n
+
+    def getvalue(self) -> str:
+        return b"".join(self._chunks).decode('utf-8', 'surrogatepass')
+
+    def _stop(self, reason):
+        self.stopped = reason
+        raise reason()
+
+    def _check_tokens(self, text):
+        if self._in_long_token:
+            # skip the rest of a token too long to keep
+            match = _whitespace_re.search(text)
+            if match is None:
+                return
+            self._in_long_token = False
+            text = text[match.start():]
+        else:
+            text = self._partial + text
+        tokens = text.split()
+        self._partial = ""
+        if tokens and not text[-1].isspace():
+            last = tokens.pop()
+            if len(last) > self.max_token_len:
+                self._in_long_token = True
+            else:
+                self._partial = last
+        for token in tokens:
+            if token not in self.expected_tokens and not is_number(token):
+                self._stop(OutputMismatch)
+
+
+_whitespace_re = re.compile(r"\s")
+
+
+class BoundedStdout(io.TextIOWrapper):
+    """
+    Stdout capture bounded in size, and stopped early on output that cannot match (see OutputSink).
+    Writes are buffered, so the sink sees (and checks) them in large chunks rather than print by print.
+    Like the StringIO it replaces, it has no binary buffer attribute.
+    """
+    buffer_size = 1 << 16
+
+    def __init__(self):
+        self.sink = OutputSink()
+        super().__init__(
+            io.BufferedWriter(self.sink, buffer_size=self.buffer_size),
+            encoding='utf-8',
+            errors='surrogatepass',
+            newline='\n',
+        )
+
+    @property
+    def buffer(self):
+        raise AttributeError("buffer")
+
+    def reset(self, limit=None, expected_tokens=None):
+        self.sink.armed = False
+        self.flush()
+        self.sink.reset(limit, expected_tokens)
+
+    def getvalue(self) -> str:
+        armed, self.sink.armed = self.sink.armed, False
+        try:
+            self.flush()
+        finally:
+            self.sink.armed = armed
+        return self.sink.getvalue()
+
+
+class StdioHarness:
+    """
+    Standard IO for running standard input solutions, made once per process and reset between tests,
+    instead of building mock patches for every test.
+
+    While installed, sys.stdin is an in-memory file of the test input, as is anything opened (eg open(0)).
+    As under the mock patches of the official APPS checker, the stdin it replaces (which solutions still
+    reach through `from sys import stdin` or the prelude's `stdin`) reads the test input too: its readline
+    returns the next line without the newline, readlines the lines and read the whole input.
+
+    Output is bounded (see OutputSink), so a solution printing in a loop cannot use up memory.
+
+    Attributes:
+        stdin (StringIO): The stdin solutions read from.
+        stdout (BoundedStdout): Buffer reused to capture stdout (see Capturing).
+    """
+    _stdin_methods = ('readline', 'readlines', 'read')
+
+    def __init__(self):
+        self.stdin = StringIO()
+        self.stdout = BoundedStdout()
+        self._inputs = ""
+        self._lines = None
+
+    def reset_stdout(self, limit=None, expected_tokens=None) -> BoundedStdout:
+        """
+        Resets stdout for the next test, or makes a new one if a solution broke it (eg by detaching it).
+        """
+        try:
+            self.stdout.reset(limit, expected_tokens)
+        except Exception:
+            self.stdout = BoundedStdout()
+            self.stdout.reset(limit, expected_tokens)
+        return self.stdout
+
+    def reset(self, inputs: str):
+        if self.stdin.closed:
+            self.stdin = StringIO()
+        # drop anything a solution attached to stdin
+        self.stdin.__dict__.clear()
+        self.stdin.seek(0)
+        self.stdin.truncate()
+        self.stdin.write(inputs)
+        self.stdin.seek(0)
+        self._inputs = inputs
+        self._lines = None
+
+    def readline(self, *args):
+        if self._lines is None:
+            self._lines = iter(self._inputs.split("\n"))
+        return next(self._lines)
+
+    def readlines(self, *args):
+        return self._inputs.split("\n")
+
+    def read(self, *args):
+        return self._inputs
+
+    def open(self, *args, **kwargs):
+        return StringIO(self._inputs)
+
+    @contextlib.contextmanager
+    def installed(self):
+        stdin, open_ = sys.stdin, builtins.open
+        shadowed = getattr(stdin, '__dict__', {})
+        saved = {name: shadowed[name] for name in self._stdin_methods if name in shadowed}
+        patched = []
+        for name in self._stdin_methods:
+            try:
+                setattr(stdin, name, getattr(self, name))
+                patched.append(name)
+            except AttributeError:
+                pass
+        sys.stdin, builtins.open = self.stdin, self.open
+        sink = self.stdout.sink
+        sink.armed = True
+        try:
+            yield self
+            # output still buffered is checked too
+            self.stdout.flush()
+        finally:
+            sink.armed = False
+            sys.stdin, builtins.open = stdin, open_
+            for name in patched:
+                if name in saved:
+                    setattr(stdin, name, saved[name])
+                else:
+                    delattr(stdin, name)
+
+
+_stdio_harness = None
+
+
+def get_stdio_harness() -> StdioHarness:
+    global _stdio_harness
+    if _stdio_harness is None:
+        _stdio_harness = StdioHarness()
+    return _stdio_harness
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Utility for testing code generation.")
     parser.add_argument("-v", "--verbosity-level", action="store", type=int,
@@ -76,39 +318,50 @@ def parse_args():
     return args
 
 
-def run_test(in_outs:Dict=None, test:str=None, debug:bool=False, return_output:bool=False):
+def run_test(in_outs:Dict=None, test:str=None, debug:bool=False, return_output:bool=False, fail_fast:bool=False,
+             test_timeout:float=None, test_stats:list=None, test_output_limit:int=None):
     """
     if test is not None it'll try to run the code.
     otherwise it'll just return an input and output pair.
+    in_outs is the parsed input_output of a problem, or its CompiledTestSet (see compiled_tests.py).
+    with fail_fast, stops at the first test that does not pass, so results can be shorter than the tests.
+    test_timeout is the time limit in seconds for each test (and for compilation), defaults to `timeout`.
+    if test_stats is a list, a dict of measurements (wall_time, cpu_time, peak_rss) is appended for every executed test.
+    test_output_limit is the max bytes of stdout per test (at least twice the expected output),
+    defaults to `output_limit`. standard input tests going over it get OUTPUT_LIMIT_EXCEEDED (-3).
+    standard input tests are stopped early as failed once their output can no longer match.
     """
+    test_timeout = test_timeout or timeout
+    test_output_limit = test_output_limit or output_limit
     if debug:
         print(f"start = {datetime.now().time()}")
 
+    #else:
+    #    continue
+    if test is None:
+        if return_output:
+            return in_outs, [] 
+        return in_outs
 
+    test_set = load_compiled_test_set(in_outs)
     if debug:
-        print(f"test cases json = {in_outs['inputs']} {in_outs['outputs']}")
-    
-    if in_outs.get("fn_name") is None:
+        print(f"test cases = {len(test_set)}")
+
+    if test_set.fn_name is None:
         which_type = CODE_TYPE.standard_input  # Standard input
         method_name = None
     else:
         which_type = CODE_TYPE.call_based  # Call-based
-        method_name = in_outs["fn_name"]
+        method_name = test_set.fn_name
     if debug:
         print(f"loaded json = {datetime.now().time()}")
- 
-    #else:
-    #    continue
-    if test is None:
-        if return_output:
-            return in_outs, [] 
-        return in_outs
-    elif test is not None:
+
+    if test is not None:
         # Disable functionalities that can make destructive changes to the test.
         reliability_guard()
         
         results = []
-        sol = "import sys\nimport time\nimport itertools\nfrom itertools import accumulate, product, permutations, combinations\nimport collections\nfrom collections import Counter, OrderedDict, deque, defaultdict, ChainMap\nfrom functools import lru_cache\nimport math\nfrom math import sqrt, sin, cos, tan, ceil, fabs, floor, gcd, exp, log, log2\nimport fractions\nfrom typing import List, Tuple\nimport numpy as np\nimport random\nimport heapq\nfrom heapq import *\n"
+        sol = APPS_PRELUDE
         if debug:
             print(f"loading test code = {datetime.now().time()}")
  
@@ -116,22 +369,22 @@ def run_test(in_outs:Dict=None, test:str=None, debug:bool=False, return_output:b
             sol += test
             if debug: # or True:
                 print(f"sol = {sol}")
-            signal.alarm(timeout)
+            signal.setitimer(signal.ITIMER_REAL, test_timeout)
             try:
                 tmp_sol = RuntimeModule.from_string("tmp_sol", "", sol)
                 if "class Solution" not in test:
                     tmp = tmp_sol
                 else:
                     tmp = tmp_sol.Solution()
-                signal.alarm(0)
+                signal.setitimer(signal.ITIMER_REAL, 0)
             except Exception as e:
-                signal.alarm(0)
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 print(f"type 0 compilation error = {e}")
                 results.append(-2)
                 if return_output:
                     return results, []  
                 return results
-            signal.alarm(0)
+            signal.setitimer(signal.ITIMER_REAL, 0)
 
         elif which_type == CODE_TYPE.standard_input:
             # sol
@@ -165,26 +418,26 @@ def run_test(in_outs:Dict=None, test:str=None, debug:bool=False, return_output:b
                 print(f"sol = {sol}")
                 # print(f"{o}") 
             method_name = "code"
-            signal.alarm(timeout)
+            signal.setitimer(signal.ITIMER_REAL, test_timeout)
             try:
                 tmp_sol = RuntimeModule.from_string("tmp_sol", "", sol)
                 tmp = tmp_sol
-                signal.alarm(0)
+                signal.setitimer(signal.ITIMER_REAL, 0)
             except Exception as e:
-                signal.alarm(0)
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 print(f"type 1 compilation error = {e}")
                 results.append(-2)
                 if return_output:
                     return results, []  
                 return results
-            signal.alarm(0)
+            signal.setitimer(signal.ITIMER_REAL, 0)
         if debug:
             print(f"get method = {datetime.now().time()}")
  
         try:
             method = getattr(tmp, method_name)  # get_attr second arg must be str
         except:
-            signal.alarm(0)
+            signal.setitimer(signal.ITIMER_REAL, 0)
             e = sys.exc_info()
             print(f"unable to get function error = {e}")
             results.append(-2)
@@ -193,270 +446,113 @@ def run_test(in_outs:Dict=None, test:str=None, debug:bool=False, return_output:b
             return results
         
         all_outputs = [] 
-        for index, inputs in enumerate(in_outs["inputs"]):
-            # JSON forces dictionaries to have string keys; this undoes this (assuming a singleton list)
-            try:
-                if isinstance(inputs[0], dict):
-                    inputs = [{int(k): v for k,v in inputs[0].items()}]
-            except:
-                True
-            try:
-                if isinstance(in_outs["outputs"][index], dict):
-                    in_outs["outputs"][index] = [{int(k): v for k,v in in_outs["outputs"][index].items()}]
-            except:
-                True
-            try:
-                if isinstance(in_outs["outputs"][index][0], dict):
-                    in_outs["outputs"][index] = [{int(k): v for k,v in in_outs["outputs"][index][0].items()}]
-            except:
-                True
+        for index, case in enumerate(test_set.cases):
+            if fail_fast and results and results[-1] != True:
+                if debug:
+                    print(f"fail fast, skipping {len(test_set) - index} tests")
+                break
 
             if debug:
-                print(f"time: {datetime.now().time()} testing index = {index}  inputs = {inputs}, {type(inputs)}. type = {which_type}")
+                print(f"time: {datetime.now().time()} testing index = {index}  inputs = {case.raw_input}, {type(case.raw_input)}. type = {which_type}")
             if which_type == CODE_TYPE.call_based:  # Call-based
-                signal.alarm(timeout)
+                signal.setitimer(signal.ITIMER_REAL, test_timeout)
                 faulthandler.enable()
                 try:
                     # print("------------")
                     # print(inputs)
-                    output = method(*inputs)
+                    test_start = start_test_stats(test_stats)
+                    try:
+                        # copy as solutions may modify their arguments, and the test set is shared
+                        output = method(*copy.deepcopy(case.args))
+                    finally:
+                        record_test_stats(test_stats, test_start)
                     original_output = copy.deepcopy(output)
 
-                    # ground truth sequences are not tuples
-                    if isinstance(output, tuple):
-                        output = list(output)
-                    
-                    tmp_result = output == in_outs["outputs"][index]
-                    if isinstance(in_outs["outputs"][index], list) and in_outs["outputs"][index]:
-                        tmp_result = tmp_result or (output == in_outs["outputs"][index][0])
-
-                    # ground truth sequences are not tuples
-                    try:
-                        if isinstance(output[0], tuple):
-                            tmp_result = tmp_result or ([list(x) for x in output] == in_outs["outputs"][index][0])
-                    except:
-                        True
+                    tmp_result = compare_return(output, case)
                     results.append(tmp_result)
                     if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
+                        all_outputs.append((original_output, case.expected, case.raw_input))
                         # all_outputs.append(original_output)
 
                     # reset the alarm
-                    signal.alarm(0)
+                    signal.setitimer(signal.ITIMER_REAL, 0)
                 except Exception as e:
-                    signal.alarm(0)
+                    signal.setitimer(signal.ITIMER_REAL, 0)
                     faulthandler.disable()
                     print(f"Standard input runtime error or time limit exceeded error = {e}")
                     results.append(-1)
                     if return_output:
-                        all_outputs.append((None, in_outs['outputs'][index], in_outs["inputs"][index]))
+                        all_outputs.append((None, case.expected, case.raw_input))
                         # all_outputs.append(None)
                     continue
                 faulthandler.disable()
-                signal.alarm(0)
+                signal.setitimer(signal.ITIMER_REAL, 0)
                 if debug:
-                    print(f"outputs = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs}, {type(inputs)}, {output == [in_outs['outputs'][index]]}")
+                    print(f"outputs = {output}, test outputs = {case.expected}, inputs = {case.raw_input}, {output == [case.expected]}")
             elif which_type == CODE_TYPE.standard_input:  # Standard input
                 faulthandler.enable()
-                signal.alarm(timeout)
+                signal.setitimer(signal.ITIMER_REAL, test_timeout)
                 passed = False
 
-                if isinstance(inputs, list):
-                    inputs = "\n".join(inputs)
-                if isinstance(in_outs['outputs'][index], list):
-                    in_outs['outputs'][index] = "\n".join(in_outs['outputs'][index])
-
-                with Capturing() as output:
+                stdout = get_stdio_harness().reset_stdout(
+                    max(test_output_limit, 2 * len(case.expected)), case.expected_tokens
+                )
+                with Capturing(stdout) as output:
                     try:
-                        call_method(method, inputs)
+                        test_start = start_test_stats(test_stats)
+                        try:
+                            call_method(method, case.stdin)
+                        finally:
+                            record_test_stats(test_stats, test_start)
                         # reset the alarm
-                        signal.alarm(0)
+                        signal.setitimer(signal.ITIMER_REAL, 0)
                         passed = True
+                    except OutputStopped:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
                     except Exception as e:
                         # runtime error or took too long
-                        signal.alarm(0)
-                        print(f"Call-based runtime error or time limit exceeded error = {repr(e)}{e}")
-                        results.append(-1)
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+                        if stdout.sink.stopped is None:
+                            print(f"Call-based runtime error or time limit exceeded error = {repr(e)}{e}")
+                            results.append(-1)
+                            if return_output:
+                                all_outputs.append((None, case.expected, case.raw_input))
+                                # all_outputs.append(None)
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+
+                if stdout.sink.stopped is not None:
+                    # stopped early (even if the solution caught it), on too much output or output that cannot match
+                    if stdout.sink.stopped is OutputLimitExceeded:
+                        results.append(OUTPUT_LIMIT_EXCEEDED)
+                        if return_output:
+                            all_outputs.append((None, case.expected, case.raw_input))
+                    else:
+                        # reported as a failure of the whole cascade would be
+                        results.append(False)
                         if return_output:
-                            all_outputs.append((None, in_outs['outputs'][index], in_outs["inputs"][index]))
-                            # all_outputs.append(None)
-                    signal.alarm(0)
+                            all_outputs.append((list(output), case.expected_token_lines, case.raw_input))
+                    continue
 
                 if not passed:
                     if debug:
                         nl = "\n"
-                        if not isinstance(inputs, list):
-                            print(f"not passed output = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs.replace(nl,' new-line ')}, {type(inputs)}, {output == [in_outs['outputs'][index]]}")
-                        else:
-                            print(f"not passed output = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs}, {type(inputs)}, {output == [in_outs['outputs'][index]]}")
+                        print(f"not passed output = {output}, test outputs = {case.expected}, inputs = {case.stdin.replace(nl,' new-line ')}")
                     continue
 
                 if passed and debug:
-                    print(f"==> output = {output}, test outputs = {in_outs['outputs'][index]}")
-
-                original_output = copy.deepcopy(output)
-                
-                if custom_compare_(output, in_outs['outputs'][index]):
-                    tmp_result = True
-                    results.append(tmp_result)
-                    if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
-                        # all_outputs.append(original_output)
-                    continue
-
-                # ground truth sequences are expressed as lists not tuples
-                if isinstance(output, tuple):
-                    output = list(output)
-
-                tmp_result = False
-                try:
-                    tmp_result = (output == [in_outs["outputs"][index]])
-                    if isinstance(in_outs["outputs"][index], list):
-                        tmp_result = tmp_result or (output == in_outs["outputs"][index])
-                        if isinstance(output[0], str):
-                            tmp_result = tmp_result or ([e.strip() for e in output] == in_outs["outputs"][index])
-                except Exception as e:
-                    print(f"Failed check1 exception = {e}")
-                    pass
-
-                if tmp_result == True:  
-                    results.append(tmp_result)
-                    if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
-                        # all_outputs.append(original_output)
-                    continue
-
-                # try one more time without \n
-                if isinstance(in_outs["outputs"][index], list):
-                    for tmp_index, i in enumerate(in_outs["outputs"][index]):
-                        in_outs["outputs"][index][tmp_index] = i.split("\n")
-                        in_outs["outputs"][index][tmp_index] = [x.strip() for x in in_outs["outputs"][index][tmp_index] if x]
-                else:
-                    in_outs["outputs"][index] = in_outs["outputs"][index].split("\n")
-                    in_outs["outputs"][index] = list(filter(len, in_outs["outputs"][index]))
-                    in_outs["outputs"][index] = list(map(lambda x:x.strip(), in_outs["outputs"][index]))
-
-                try:
-                    tmp_result = (output == [in_outs["outputs"][index]])
-                    if isinstance(in_outs["outputs"][index], list):
-                        tmp_result = tmp_result or (output == in_outs["outputs"][index])
-                except Exception as e:
-                    print(f"Failed check2 exception = {e}")
-                    pass
-
-                if tmp_result == True:
-                    results.append(tmp_result)
-                    if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
-                        # all_outputs.append(original_output)
-                    continue
-
-                # try by converting the output into a split up list too
-                if isinstance(output, list):
-                    output = list(filter(len, output))
-
-                if debug:
-                    nl = "\n"
-                    if not isinstance(inputs, list):
-                        print(f"output = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs.replace(nl,' new-line ')}, {type(inputs)}, {output == [in_outs['outputs'][index]]}") 
-                    else:
-                        print(f"output = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs}, {type(inputs)}, {output == [in_outs['outputs'][index]]}") 
-                
-                if tmp_result == True:
-                    results.append(tmp_result)
-                    if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
-                        # all_outputs.append(original_output)
-                    continue
-
-                try:
-                    tmp_result = (output == [in_outs["outputs"][index]])
-                    if isinstance(in_outs["outputs"][index], list):
-                        tmp_result = tmp_result or (output == in_outs["outputs"][index])
-                except Exception as e:
-                    print(f"Failed check3 exception = {e}")
-                    pass
-
-                try:
-                    output_float = [float(e) for e in output]
-                    gt_float = [float(e) for e in in_outs['outputs'][index]]
-                    tmp_result = tmp_result or ((len(output_float) == len(gt_float)) and np.allclose(output_float, gt_float))
-                except Exception as e:
-                    pass
-                try:
-                    if isinstance(output[0], list):
-                        output_float = [float(e) for e in output[0]]
-                        gt_float = [float(e) for e in in_outs['outputs'][index][0]]
-                        tmp_result = tmp_result or ((len(output_float) == len(gt_float)) and np.allclose(output_float, gt_float))
-                except Exception as e:
-                    pass
-
-                if tmp_result == True:
-                    results.append(tmp_result)
-                    if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
-                        # all_outputs.append(original_output)
-                    continue
-
-                # try by converting the stuff into split up list
-                if isinstance(in_outs["outputs"][index], list):
-                    for tmp_index, i in enumerate(in_outs["outputs"][index]):
-                        in_outs["outputs"][index][tmp_index] = set(i.split())
-                else:
-                    in_outs["outputs"][index] = set(in_outs["outputs"][index].split())
-
-                try:
-                    tmp_result = (output == in_outs["outputs"][index])
-                except Exception as e:
-                    print(f"Failed check4 exception = {e}")
-                    continue
-
-                if tmp_result == True:
-                    results.append(tmp_result)
-                    if return_output:
-                        all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
-                        # all_outputs.append(original_output)
-                    continue 
-
-                # try by converting the output into a split up list too
-                if isinstance(output, list):
-                    for tmp_index, i in enumerate(output):
-                        output[tmp_index] = i.split()
-                    output = list(filter(len, output))
-                    for tmp_index, i in enumerate(output):
-                        output[tmp_index] = set(i)    
-                else:
-                    output = output.split()
-                    output = list(filter(len, output))
-                    output = set(output)
-
-                try:
-                    tmp_result = (set(frozenset(s) for s in output) == set(frozenset(s) for s in in_outs["outputs"][index]))
-                except Exception as e:
-                    print(f"Failed check5 exception = {e}")
+                    print(f"==> output = {output}, test outputs = {case.expected}")
 
+                # the expected output is compared in the form that decided the verdict (see compare_stdout)
+                original_output = list(output)
+                tmp_result, expected_output = compare_stdout(output, case)
 
-                # if they are all numbers, round so that similar numbers are treated as identical
-                try:
-                    tmp_result = tmp_result or (set(frozenset(round(float(t),3) for t in s) for s in output) ==\
-                        set(frozenset(round(float(t),3) for t in s) for s in in_outs["outputs"][index]))
-                except Exception as e:
-                    print(f"Failed check6 exception = {e}")
-                
                 if tmp_result == True and debug:
                     print("PASSED")
-             
+
                 results.append(tmp_result)
                 if return_output:
-                    all_outputs.append((original_output, in_outs['outputs'][index], in_outs["inputs"][index]))
+                    all_outputs.append((original_output, expected_output, case.raw_input))
                     # all_outputs.append(original_output)
-                
-                if debug:
-                    nl = "\n"
-                    if not isinstance(inputs, list):
-                        print(f"output = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs.replace(nl,' new-line ')}, {type(inputs)}, {output == [in_outs['outputs'][index]]}")
-                    else:
-                        print(f"output = {output}, test outputs = {in_outs['outputs'][index]}, inputs = {inputs}, {type(inputs)}, {output == [in_outs['outputs'][index]]}") 
 
     if return_output:
         return results, all_outputs
@@ -487,25 +583,30 @@ def call_method(method, inputs):
     if isinstance(inputs, list):
         inputs = "\n".join(inputs)
 
-    inputs_line_iterator = iter(inputs.split("\n"))
-
     # sys.setrecursionlimit(10000)
 
-    # @patch('builtins.input', side_effect=inputs.split("\n"))
-    @patch('builtins.open', mock_open(read_data=inputs))
-    @patch('sys.stdin', StringIO(inputs))
-    @patch('sys.stdin.readline', lambda *args: next(inputs_line_iterator))
-    @patch('sys.stdin.readlines', lambda *args: inputs.split("\n"))
-    @patch('sys.stdin.read', lambda *args: inputs)
-    # @patch('sys.stdout.write', print)
-    def _inner_call_method(_method):
+    harness = get_stdio_harness()
+    harness.reset(inputs)
+    with harness.installed():
         try:
-            return _method()
+            return method()
         except SystemExit as e:
             pass
-        finally:
-            pass
-    return _inner_call_method(method) 
+
+def warm_up_worker(memory_limit=None):
+    """
+    Initializer for execution workers: import the prelude modules once (numpy alone takes
+    hundreds of ms) and disable destructive functions, so solutions start from a warm process.
+    memory_limit (bytes) caps the memory solutions can allocate on top of the warm worker's
+    (whose address space is mostly shared libraries and thread arenas), via rlimits.
+    """
+    exec(APPS_PRELUDE, {})
+    get_stdio_harness()
+    maximum_memory_bytes = None
+    if memory_limit:
+        maximum_memory_bytes = (get_address_space_size() or 0) + memory_limit
+    reliability_guard(maximum_memory_bytes)
+
 
 def reliability_guard(maximum_memory_bytes=None):
     """
@@ -607,7 +708,7 @@ def main():
 
     tmp = run_test(tests, solution)
     print("results = ", tmp)
-    print("-2 = compile error, -1 is runtime error, False failed test, True passed test")
+    print("-3 = output limit exceeded, -2 = compile error, -1 is runtime error, False failed test, True passed test")
 
 if __name__ == "__main__":
     # args = parse_args()
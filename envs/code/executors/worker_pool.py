@@ -0,0 +1,462 @@
+"""
+Long-lived pool of worker processes for executing untrusted code.
+
+Spawning a fresh process (plus a multiprocessing Manager) for every submission costs more than
+most solutions take to run, so workers are kept alive and reused. A worker is recycled
+(killed and lazily replaced) after `max_jobs_per_worker` jobs, or as soon as a job times out,
+raises, or takes the worker down with it, so state leaked by one solution has a bounded lifetime.
+
+With `fork_per_job`, a worker instead acts as a fork server ("zygote"): it is warmed up once by
+the initializer (eg pre-importing modules, applying reliability_guard) and then forks a child per
+job, so every job starts from the same warm, clean state at the cost of a fork.
+
+Workers are started from a fork server process ("forkserver" start method, where available) rather than forked
+from the evaluator, which runs actor and prefetch threads that a fork would copy mid-operation. The module of
+the initializer (and the main module, which must guard its entry point) are preloaded by the fork server,
+so starting a worker does not import them again. A worker holds no end of the pool's pipes but its own,
+so it gets EOF and exits if the evaluator dies, even if it is killed.
+
+A worker reports when it is ready to run jobs. One that dies before (eg the fork server fails to start, or the
+initializer raises) is an error of the pool, raised as WorkerStartupError, not a result of the job.
+
+Jobs are (fn, args, kwargs) triples, so fn must be picklable (ie defined at module level).
+A job may also carry a keyed payload (eg the test set of a problem), which is sent to a worker only the first
+time it runs a job with that key, and passed to fn as its first argument. Workers keep the last
+`max_payloads` payloads they received.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import select
+import signal
+import sys
+import threading
+import time
+import weakref
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional
+
+logger = logging.getLogger("logger")
+
+# modules the fork server imports before forking workers, see _get_context
+_forkserver_preload = {'__main__'}
+# the pools' ends of the worker pipes, which a worker forked from the pool's process closes (see _worker_main)
+_pool_conns = weakref.WeakSet()
+
+# job statuses
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+CRASHED = 'crashed'
+
+# sent by a worker once started, before its first job
+READY = 'ready'
+
+
+class WorkerStartupError(RuntimeError):
+    """A worker process died or hung before it could run a job."""
+
+
+class JobResult(NamedTuple):
+    status: str
+    value: Any
+    elapsed: float
+
+    @property
+    def ok(self):
+        return self.status == OK
+
+
+def _touch_payload_key(keys: OrderedDict, key, max_payloads: int) -> bool:
+    """
+    Marks key as the most recently used payload, evicting the least recently used beyond max_payloads.
+    Applied in the same order by a worker to its payloads and by the pool to its record of them, so both agree.
+    Returns whether key was already there.
+    """
+    present = key in keys
+    if present:
+        keys.move_to_end(key)
+    else:
+        keys[key] = None
+        while len(keys) > max_payloads:
+            keys.popitem(last=False)
+    return present
+
+
+def _run_job(fn, args, kwargs):
+    try:
+        return OK, fn(*args, **kwargs)
+    except BaseException as e:
+        # BaseException as solutions can raise SystemExit / KeyboardInterrupt
+        return ERROR, f"{type(e).__name__}: {e}"
+
+
+def _run_job_in_child(fn, args, kwargs, timeout, fork, kill):
+    """
+    Forks a child to run the job and waits at most `timeout` seconds for its result,
+    killing it on timeout. The result is pickled back through a pipe.
+    """
+    r, w = os.pipe()
+    pid = fork()
+    if pid == 0:
+        os.close(r)
+        try:
+            try:
+                data = pickle.dumps(_run_job(fn, args, kwargs))
+            except BaseException as e:
+                data = pickle.dumps((ERROR, f"unable to send job result: {type(e).__name__}: {e}"))
+            view = memoryview(data)
+            while view:
+                view = view[os.write(w, view):]
+        finally:
+            os._exit(0)
+
+    os.close(w)
+    chunks, timed_out = [], False
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        ready, _, _ = select.select([r], [], [], remaining)
+        if not ready:
+            timed_out = True
+            break
+        chunk = os.read(r, 1 << 16)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(r)
+    if timed_out:
+        kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+    if timed_out:
+        return TIMEOUT, None
+    try:
+        return pickle.loads(b''.join(chunks))
+    except Exception:
+        # child died before sending a full result
+        return CRASHED, None
+
+
+def _main_is_importable() -> bool:
+    """
+    Whether processes started by spawn or a fork server can import the main module: it was run with -m, -c or
+    interactively (imported by name, or not at all), or from a file that exists (not eg '<stdin>').
+    """
+    main = sys.modules.get('__main__')
+    if getattr(getattr(main, '__spec__', None), 'name', None):
+        return True
+    main_path = getattr(main, '__file__', None)
+    return main_path is None or os.path.isfile(main_path)
+
+
+def _get_context(start_method: Optional[str] = None, initializer: Optional[Callable] = None):
+    """
+    Multiprocessing context workers are started with: start_method if given, else forkserver where available
+    and the main module is importable (else the platform's default).
+    For forkserver, the fork server preloads the main module and the module of the initializer (effective if it is
+    not running yet), so the main module must guard its entry point with `if __name__ == '__main__'`.
+    """
+    if start_method is None and _main_is_importable():
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+    ctx = multiprocessing.get_context(start_method)
+    if ctx.get_start_method() == 'forkserver':
+        module = getattr(initializer, '__module__', None)
+        if module is not None:
+            _forkserver_preload.add(module)
+        ctx.set_forkserver_preload(sorted(_forkserver_preload))
+    return ctx
+
+
+def _worker_main(conn, initializer, initargs, max_jobs, fork_per_job=False, max_payloads=0):
+    """
+    Entry point of a worker process: run jobs from the pipe until told to stop,
+    the job budget is used up, or a job raises (only if jobs run in the worker itself).
+    """
+    # ends of pipes inherited through a fork ('fork' start method): the worker would otherwise keep its own pipe,
+    # and those of the workers forked before it, open after the pool's process exits, so none would get EOF
+    for pool_conn in list(_pool_conns):
+        pool_conn.close()
+    payloads = OrderedDict()
+    # keep references as the initializer may disable these (see reliability_guard)
+    fork, kill = os.fork, os.kill
+    if initializer is not None:
+        initializer(*initargs)
+    conn.send(READY)
+    job_counter = range(max_jobs) if max_jobs else itertools.count()
+    for _ in job_counter:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        fn, args, kwargs, timeout, payload_key, payload = job
+        if payload_key is not None:
+            if not _touch_payload_key(payloads, payload_key, max_payloads):
+                payloads[payload_key] = payload
+            args = (payloads[payload_key], *args)
+        if fork_per_job:
+            out = _run_job_in_child(fn, args, kwargs, timeout, fork, kill)
+        else:
+            out = _run_job(fn, args, kwargs)
+        try:
+            conn.send(out)
+        except Exception as e:
+            out = (ERROR, f"unable to send job result: {type(e).__name__}: {e}")
+            conn.send(out)
+        if out[0] != OK and not fork_per_job:
+            # worker state is suspect after an error, let the pool replace it
+            break
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, initializer, initargs, max_jobs, fork_per_job, max_payloads=0):
+        self.conn, child_conn = ctx.Pipe()
+        _pool_conns.add(self.conn)
+        self.proc = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, initializer, initargs, max_jobs, fork_per_job, max_payloads),
+            daemon=True,
+        )
+        self.proc.start()
+        child_conn.close()
+        self.max_jobs = max_jobs
+        self.jobs_done = 0
+        self.max_payloads = max_payloads
+        # keys of the payloads the worker holds, see _touch_payload_key
+        self.payload_keys = OrderedDict()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Waits for the worker to report it started, False if it died or did not within timeout.
+        """
+        try:
+            return self.conn.poll(timeout) and self.conn.recv() == READY
+        except (EOFError, OSError):
+            return False
+
+    def stop(self):
+        try:
+            if self.proc.is_alive():
+                self.proc.kill()
+            self.proc.join()
+        except Exception as e:
+            logger.error(f"Error stopping worker {self.proc.pid}: {e}")
+        self.conn.close()
+
+
+class WorkerPool:
+    """
+    A thread-safe pool of reusable worker processes.
+
+    Attributes:
+        num_workers (int): Maximum number of live worker processes.
+        max_jobs_per_worker (int): Jobs a worker runs before it is recycled. None or 0 for no limit.
+        initializer (callable): Optional function run once in each worker when it starts.
+        initargs (tuple): Arguments for the initializer.
+        fork_per_job (bool): Fork a child from the (warm) worker for every job instead of
+            running jobs in the worker itself. Failed jobs then do not recycle the worker.
+        max_payloads (int): Payloads each worker keeps (see run).
+        start_method (str): Multiprocessing start method of the workers, None for forkserver where available.
+            Initializer, initargs and jobs must be picklable unless it is 'fork'.
+    """
+    # extra time the pool waits on a fork server, which enforces the job timeout itself
+    fork_grace_period = 1
+    # time a new worker has to run the initializer (and a fork server to start) before it counts as failed
+    start_timeout = 60
+    # workers that fail to start in a row before the pool gives up
+    max_start_attempts = 3
+
+    def __init__(
+        self,
+        num_workers: int = 1,
+        max_jobs_per_worker: Optional[int] = 20,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        fork_per_job: bool = False,
+        max_payloads: int = 8,
+        start_method: Optional[str] = None,
+    ):
+        self.num_workers = max(1, num_workers)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.initializer = initializer
+        self.initargs = initargs
+        self.fork_per_job = fork_per_job
+        self.max_payloads = max_payloads
+        self.start_method = start_method
+        self._ctx = _get_context(start_method, initializer)
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self._num_live = 0
+
+    def _check_pid(self):
+        # the pool was inherited through a fork: the workers (and pipes) belong to the parent
+        if os.getpid() != self._pid:
+            self._reset_state()
+
+    def _acquire(self) -> _Worker:
+        self._check_pid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            spawn = self._num_live < self.num_workers
+            if spawn:
+                self._num_live += 1
+        if spawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._num_live -= 1
+                raise
+        return self._idle.get()
+
+    def _spawn(self) -> _Worker:
+        for _ in range(self.max_start_attempts):
+            worker = _Worker(
+                self._ctx, self.initializer, self.initargs, self.max_jobs_per_worker, self.fork_per_job,
+                self.max_payloads,
+            )
+            if worker.wait_ready(self.start_timeout):
+                return worker
+            worker.stop()
+            logger.error(f"Execution worker {worker.proc.pid} failed to start (exit code {worker.proc.exitcode})")
+        raise WorkerStartupError(
+            f"{self.max_start_attempts} execution workers in a row failed to start (last exit code "
+            f"{worker.proc.exitcode}), see their stderr. With the {self._ctx.get_start_method()} start method, "
+            f"check that the main module guards its entry point with `if __name__ == '__main__'`, and that the "
+            f"initializer does not raise."
+        )
+
+    def _release(self, worker: _Worker, recycle: bool = False):
+        worker.jobs_done += 1
+        used_up = worker.max_jobs and worker.jobs_done >= worker.max_jobs
+        if recycle or used_up or os.getpid() != self._pid:
+            worker.stop()
+            with self._lock:
+                self._num_live -= 1
+        else:
+            self._idle.put(worker)
+
+    def run(self, fn: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+            timeout: Optional[float] = None, payload: Optional[tuple] = None) -> JobResult:
+        """
+        Runs fn(*args, **kwargs) in a worker, blocking until it finishes or times out.
+        A worker that times out or dies is killed and replaced (for fork servers, only the child is
+        killed unless the server itself stops responding).
+        Raises WorkerStartupError if no worker can be started.
+
+        With payload, a (key, value) pair, runs fn(value, *args, **kwargs) instead, sending value only if the
+        worker does not hold the payload of that key yet. value must not change for a key.
+
+        Returns:
+            JobResult: status (OK, ERROR, TIMEOUT or CRASHED), the return value of fn if OK
+                (else an error message or None), and the wall time spent in the job.
+        """
+        worker = self._acquire()
+        start = time.time()
+        status, value = CRASHED, None
+        healthy = False
+        poll_timeout = timeout
+        if self.fork_per_job and timeout is not None:
+            poll_timeout = timeout + self.fork_grace_period
+        payload_key, payload_value = payload if payload is not None else (None, None)
+        if payload_key is not None and _touch_payload_key(worker.payload_keys, payload_key, worker.max_payloads):
+            payload_value = None
+        try:
+            worker.conn.send((fn, args, kwargs or {}, timeout, payload_key, payload_value))
+            if worker.conn.poll(poll_timeout):
+                status, value = worker.conn.recv()
+                healthy = status == OK or self.fork_per_job
+            else:
+                status = TIMEOUT
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._release(worker, recycle=not healthy)
+        return JobResult(status, value, time.time() - start)
+
+    def map(self, fn: Callable, args_list, timeout: Optional[float] = None,
+            max_concurrency: Optional[int] = None, payloads: Optional[list] = None) -> List[JobResult]:
+        """
+        Runs fn over args_list concurrently, one job per worker, with the timeout applying to each job.
+
+        Args:
+            fn (callable): Function to run in the workers.
+            args_list (iterable): Positional argument tuples, one per job.
+            timeout (float, optional): Timeout per job.
+            max_concurrency (int, optional): Cap on jobs in flight, on top of the pool size.
+            payloads (list, optional): Payload of each job (see run), aligned with args_list.
+
+        Returns:
+            list: JobResults in the same order as args_list.
+        """
+        args_list = list(args_list)
+        payloads = payloads if payloads is not None else [None] * len(args_list)
+        n_threads = min(len(args_list), max_concurrency or self.num_workers, self.num_workers)
+        if n_threads <= 1:
+            return [
+                self.run(fn, args, timeout=timeout, payload=payload) for args, payload in zip(args_list, payloads)
+            ]
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            return list(executor.map(
+                lambda args, payload: self.run(fn, args, timeout=timeout, payload=payload), args_list, payloads
+            ))
+
+    def close(self):
+        """
+        Stops all idle workers. Workers busy in other threads are stopped when released.
+        """
+        self._check_pid()
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self._lock:
+                self._num_live -= 1
+
+    def __deepcopy__(self, memo):
+        # processes cannot be copied, and the pool is meant to be shared anyway
+        return self
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(name: str = 'default', **config) -> WorkerPool:
+    """
+    Returns the process-wide pool registered under name, creating it from config on first use.
+
+    Later calls update num_workers / max_jobs_per_worker in place, and replace the pool if its
+    initializer, initargs or fork_per_job change. Config values of None are ignored.
+    """
+    config = {k: v for k, v in config.items() if v is not None}
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is not None and any(
+            getattr(pool, k) != config[k] for k in ('initializer', 'initargs', 'fork_per_job') if k in config
+        ):
+            pool.close()
+            pool = None
+        if pool is None:
+            pool = _pools[name] = WorkerPool(**config)
+        else:
+            for k in ('num_workers', 'max_jobs_per_worker'):
+                if k in config:
+                    setattr(pool, k, config[k])
+    return pool
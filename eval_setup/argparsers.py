@@ -28,6 +28,8 @@ def get_base_agent_parser():
     parser.add_argument("--do_test", action="store_true")
     parser.add_argument("--eval_later", action="store_true", help="batch eval at the end instead of every step")
     parser.add_argument("--use_public_tests", action="store_true", help="use public tests before official eval")
+    parser.add_argument("--eval_workers", type=int, default=0, help="eval_later: score samples with k processes, 0 to skip")
+    parser.add_argument("--prefetch_depth", type=int, default=0, help="load and preprocess k tasks ahead in the background")
     parser.add_argument("--max_test_iter", type=int, default=0, help="break after k test iter, for debugging")
     
     # saving / checkpointing
@@ -49,6 +51,20 @@ def get_base_agent_parser():
 
     # parallel
     parser.add_argument("--parallel_api", action="store_true", help="parallel api calls if possible")
-    parser.add_argument("--num_agents", type=int, default=1, help="multi agents for parallel eval only")
+    parser.add_argument("--num_agents", type=int, default=1, help="parallel eval: actor replicas (threads, or tasks in flight for an async test_one)")
+
+    # execution
+    parser.add_argument("--num_exec_workers", type=int, default=1, help="persistent worker processes for code execution")
+    parser.add_argument("--max_jobs_per_worker", type=int, default=None, help="recycle an execution worker after k jobs (default 20 for APPS, 1000 for MBPP)")
+    parser.add_argument("--zygote_executor", action="store_true", help="fork a pre-warmed child per execution")
+    parser.add_argument("--fail_fast", action="store_true", help="stop official eval at the first failing test")
+    parser.add_argument("--test_timeout", type=float, default=None, help="time limit (s) per test, can be < 1")
+    parser.add_argument("--timeout_store", type=str, default="", help="json of per-problem test timeouts, APPS problems missing from it are measured on load")
+    parser.add_argument("--timeout_factor", type=float, default=4.0, help="measured timeout as a multiple of the slowest reference test")
+    parser.add_argument("--test_isolation", type=str, default="fresh", help="MBPP: 'fresh' defines code per test, 'shared' once for its tests (mutated state carries over)")
+    parser.add_argument("--test_shards", type=int, default=1, help="split a solution's tests into shards run in parallel")
+    parser.add_argument("--exec_cache_dir", type=str, default="", help="cache execution results here, empty to disable")
+    parser.add_argument("--exec_cache_max_mb", type=int, default=1024, help="size bound of the execution cache")
+    parser.add_argument("--memory_limit_mb", type=int, default=0, help="memory an execution can allocate, 0 for no limit")
 
     return parser
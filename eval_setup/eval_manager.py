@@ -1,23 +1,70 @@
+import asyncio
+import contextvars
+import copy
+import inspect
 import logging
+import os
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 
-from statistics import mean
 from tqdm import tqdm
 
-from cognitive_base.utils import dump_json, load_json
+from cognitive_base.utils import load_json, f_mkdir
 from cognitive_base.utils.log import move_log_file, construct_task_folder
+from .result_journal import ResultJournal
 from ..data_tools.base_data_pipeline import BaseDataPipeline
+from ..data_tools.prefetch import prefetch
+from ..eval_utils.generic import save_test_stats
 
 logger = logging.getLogger("logger")
 
 
+class TaskLogHandler(logging.Handler):
+    """
+    Copies the records logged by each thread (or asyncio task) to the log file of the task it is on,
+    so tasks run concurrently still get their own logfile.log in their task folder.
+    The task is tracked in a context variable, so records of threads the agent starts itself are
+    copied only if they run in a copy of the context (eg asyncio.to_thread, BaseCodeEnv.astep).
+    """
+    def __init__(self, formatter=None):
+        super().__init__()
+        self.setFormatter(formatter or logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        self._file = contextvars.ContextVar('task_log_file', default=None)
+
+    def start_task(self, path):
+        self.end_task()
+        self._file.set(open(path, 'a'))
+
+    def end_task(self):
+        f = self._file.get()
+        if f is not None:
+            f.close()
+            self._file.set(None)
+
+    def emit(self, record):
+        f = self._file.get()
+        if f is None or f.closed:
+            return
+        try:
+            f.write(self.format(record) + '\n')
+            f.flush()
+        except Exception:
+            self.handleError(record)
+
+
 class EvalManager:
-    def __init__(self, args, actor, data_pipeline: BaseDataPipeline):
+    def __init__(self, args, actor, data_pipeline: BaseDataPipeline, actors=None):
         self.args = args
         self.do_val = getattr(args, 'do_val', False)  # Default to False if not specified
         self.phase = 'val' if self.do_val else 'test'
         self.actor = actor
-        # parallel need multiple actors
-        # self.actors = actors
+        # replicas for parallel eval, made from actor if not given (see get_actors)
+        self.actors = actors
+        self._result_lock = threading.Lock()
+        # accuracy after the last result recorded in this run
+        self.acc = None
 
         self.dataset_name = args.dataset_name
         self.data_pipeline = data_pipeline
@@ -26,11 +73,17 @@ class EvalManager:
         self.dataloader = dataloader
 
         self.result_dir = args.result_dir
+        # tasks loaded and preprocessed ahead in the background, see prefetch_tasks
+        self.prefetch_depth = getattr(args, 'prefetch_depth', 0)
 
-        self.result_d = {}
+        # results are journaled as tasks finish, result_dict.json is written from the journal (see materialize_results)
+        self.journal = ResultJournal(f"{self.result_dir}/result_journal.jsonl", resume=self.args.resume)
         if self.args.resume:
-            print(f"\033[35mLoading result_dict\033[0m")
-            self.result_d = load_json(f"{self.result_dir}/result_dict.json")
+            print(f"\033[35mLoading result journal\033[0m")
+            if not len(self.journal) and os.path.exists(f"{self.result_dir}/result_dict.json"):
+                # run from before the journal
+                self.journal.update(load_json(f"{self.result_dir}/result_dict.json"))
+        self.result_d = self.journal.results
 
     def set_actor_attr(self, actor):
         if not self.args.use_public_tests:
@@ -43,13 +96,75 @@ class EvalManager:
         actor.train = False
         actor.mode = self.phase
 
-    def test_loop_serial(self):
-        actor = self.actor
-        self.set_actor_attr(actor)
+    def get_actors(self):
+        """
+        Returns args.num_agents actors for parallel eval, each with its own environment instance.
+        Given actors are used as is, others are replicas of self.actor from actor.clone(), which actors must
+        define to run in parallel: a replica that shares what is safe to share (eg LLM clients, memory) and
+        copies per-task state. Actors are not deep-copied, which would copy clients, locks and the dataloader.
+        Environments of the replicas are deep-copied if shared (execution worker pools and caches are
+        shared by the copies of an environment).
+        """
+        actors = list(self.actors or [self.actor])
+        if len(actors) < self.args.num_agents and not callable(getattr(self.actor, 'clone', None)):
+            raise TypeError(
+                f"--num_agents {self.args.num_agents} needs {type(self.actor).__name__}.clone(), returning a "
+                f"replica of the actor to run tasks in parallel with it, or the replicas passed as actors"
+            )
+        while len(actors) < self.args.num_agents:
+            actors.append(self.actor.clone())
+        seen_envs = set()
+        for actor in actors:
+            env = getattr(actor, 'env_interface', None)
+            if env is not None and id(env) in seen_envs:
+                # environments hold the state of the task they are on
+                actor.env_interface = env = copy.deepcopy(env)
+            seen_envs.add(id(env))
+        return actors
 
-        n_test = len(self.dataloader)
-        acc = None
-        for i, batch in enumerate(tqdm(self.dataloader, leave=False)):
+    def record_result(self, task_id, success, parsed_result, actor=None):
+        """
+        Adds the result of a task to the journal, if parsed, and updates acc. Thread-safe.
+        With the actor that ran the task, also saves the measurements of the tests it ran
+        (see BaseCodeEnv.task_test_stats) in the output.json it saved for the task, for get_test_time_stats.
+        """
+        if not parsed_result:
+            return
+        test_stats = getattr(getattr(actor, 'env_interface', None), 'task_test_stats', None)
+        if test_stats:
+            save_test_stats(construct_task_folder(self.result_dir, self.phase, task_id), test_stats)
+        with self._result_lock:
+            self.journal.record(task_id, success)
+            self.acc = self.journal.acc
+            logger.info(f'acc:{self.journal.total}/{len(self.journal)} = {self.acc:.2%}')
+
+    def materialize_results(self):
+        """
+        Writes result_dict.json from the journal. Done at the end of the test loop, and can be called any time.
+        """
+        self.journal.materialize(f"{self.result_dir}/result_dict.json")
+
+    def iter_tasks(self, progress=False):
+        """
+        Yields (iteration, task id, preprocessed task) for the tasks to run, skipping those in result_d (on resume).
+        When resuming, finished tasks are skipped from the task index of the data pipeline if it has one,
+        so they are not loaded at all.
+        """
+        task_index = None
+        if self.result_d:
+            task_index = self.data_pipeline.get_task_index(self.dataset, self.dataloader)
+        if task_index is None:
+            batches = enumerate(tqdm(self.dataloader, leave=False) if progress else self.dataloader)
+        else:
+            if self.args.max_test_iter:
+                task_index = task_index[:self.args.max_test_iter]
+            pending = [(i, key) for i, (task_id, key) in enumerate(task_index) if str(task_id) not in self.result_d]
+            logger.info(f'[{self.phase}] resuming, {len(task_index) - len(pending)} tasks done, {len(pending)} to go')
+            batches = (
+                (i, self.data_pipeline.get_batch(self.dataset, self.dataloader, key))
+                for i, key in (tqdm(pending, leave=False) if progress else pending)
+            )
+        for i, batch in batches:
             # use this instead of dataloader to break because need full dataloader for eval later
             if self.args.max_test_iter and i >= self.args.max_test_iter:
                 break
@@ -58,30 +173,185 @@ class EvalManager:
             task_id = str(full_task['task_id'])
             if task_id in self.result_d:
                 continue
+            yield i, task_id, full_task
+
+    def prefetch_tasks(self):
+        """
+        iter_tasks, with up to prefetch_depth tasks loaded and preprocessed ahead in a background thread.
+        """
+        return prefetch(self.iter_tasks(progress=True), self.prefetch_depth)
+
+    def test_loop_serial(self):
+        actor = self.actor
+        self.set_actor_attr(actor)
+
+        n_test = len(self.dataloader)
+        self.acc = None
+        for i, task_id, full_task in self.prefetch_tasks():
             logger.info(f'[{self.phase} iter]: {i + 1}/{n_test}\n')
 
             success, parsed_result = actor.test_one(full_task)
-
-            if parsed_result:
-                self.result_d[task_id] = success
-                result_val = self.result_d.values()
-                acc = mean(result_val)
-                logger.info(f'acc:{sum(result_val)}/{len(self.result_d)} = {acc:.2%}')
-                dump_json(self.result_d, f"{self.result_dir}/result_dict.json", indent=4)
+            self.record_result(task_id, success, parsed_result, actor)
 
             task_folder = construct_task_folder(self.result_dir, self.phase, task_id)
             move_log_file(f"{task_folder}/logfile.log", self.result_dir)
 
-        if acc is not None:
+        self.write_acc()
+
+    def test_loop_parallel(self):
+        """
+        Runs args.num_agents actors (see get_actors) in threads over a shared queue of tasks, as evals are bound
+        by LLM and execution latency. Results and task folders are as in test_loop_serial, and so is resume.
+        For executions not to queue up, give the environments at least as many execution workers as actors.
+        """
+        actors = self.get_actors()
+        for actor in actors:
+            self.set_actor_attr(actor)
+
+        n_test = len(self.dataloader)
+        self.acc = None
+        # bounded, so tasks are loaded just ahead of the actors
+        task_queue = queue.Queue(maxsize=2 * len(actors))
+        errors = []
+        log_handler = TaskLogHandler(next(
+            (h.formatter for h in logger.handlers if isinstance(h, logging.FileHandler)), None
+        ))
+        logger.addHandler(log_handler)
+
+        def run_actor(actor):
+            while True:
+                item = task_queue.get()
+                if item is None or errors:
+                    return
+                i, task_id, full_task = item
+                task_folder = construct_task_folder(self.result_dir, self.phase, task_id)
+                try:
+                    f_mkdir(task_folder)
+                    log_handler.start_task(f"{task_folder}/logfile.log")
+                    logger.info(f'[{self.phase} iter]: {i + 1}/{n_test}\n')
+                    success, parsed_result = actor.test_one(full_task)
+                    self.record_result(task_id, success, parsed_result, actor)
+                except BaseException as e:
+                    logger.error(f'[{self.phase}] task {task_id} failed: {type(e).__name__}: {e}')
+                    errors.append(e)
+                    return
+                finally:
+                    log_handler.end_task()
+
+        threads = [threading.Thread(target=run_actor, args=(actor,), daemon=True) for actor in actors]
+        for thread in threads:
+            thread.start()
+        try:
+            for item in self.prefetch_tasks():
+                while not errors:
+                    try:
+                        task_queue.put(item, timeout=1)
+                        break
+                    except queue.Full:
+                        pass
+                if errors:
+                    break
+        finally:
+            # one sentinel per actor still running, each takes one before exiting
+            for thread in threads:
+                while thread.is_alive():
+                    try:
+                        task_queue.put(None, timeout=1)
+                        break
+                    except queue.Full:
+                        pass
+            for thread in threads:
+                thread.join()
+            logger.removeHandler(log_handler)
+        if errors:
+            raise errors[0]
+
+        self.write_acc()
+
+    def test_loop_async(self):
+        """
+        Runs an agent whose test_one is a coroutine function on an event loop, with args.num_agents tasks in flight,
+        one per actor (see get_actors), so LLM requests of many tasks overlap in one process. Blocking work
+        (loading tasks, recording results, and env steps through BaseCodeEnv.astep) runs in a thread pool.
+        Results are recorded as each task completes, and task folders and resume are as in test_loop_serial.
+        """
+        asyncio.run(self._test_loop_async())
+
+    async def _test_loop_async(self):
+        actors = self.get_actors()
+        for actor in actors:
+            self.set_actor_attr(actor)
+
+        n_test = len(self.dataloader)
+        self.acc = None
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=len(actors) + 1)
+        loop.set_default_executor(executor)
+        idle_actors = asyncio.Queue()
+        for actor in actors:
+            idle_actors.put_nowait(actor)
+        errors = []
+        log_handler = TaskLogHandler(next(
+            (h.formatter for h in logger.handlers if isinstance(h, logging.FileHandler)), None
+        ))
+        logger.addHandler(log_handler)
+
+        def run_blocking(fn, *args):
+            # in the context of the calling task, for its logs
+            return loop.run_in_executor(None, contextvars.copy_context().run, fn, *args)
+
+        async def run_task(actor, i, task_id, full_task):
+            task_folder = construct_task_folder(self.result_dir, self.phase, task_id)
+            try:
+                await run_blocking(f_mkdir, task_folder)
+                log_handler.start_task(f"{task_folder}/logfile.log")
+                logger.info(f'[{self.phase} iter]: {i + 1}/{n_test}\n')
+                success, parsed_result = await actor.test_one(full_task)
+                await run_blocking(self.record_result, task_id, success, parsed_result, actor)
+            except BaseException as e:
+                logger.error(f'[{self.phase}] task {task_id} failed: {type(e).__name__}: {e}')
+                errors.append(e)
+            finally:
+                log_handler.end_task()
+                idle_actors.put_nowait(actor)
+
+        tasks = self.prefetch_tasks()
+        running = set()
+        try:
+            while not errors:
+                actor = await idle_actors.get()
+                if errors:
+                    break
+                item = await run_blocking(next, tasks, None)
+                if item is None:
+                    break
+                # each task runs in its own context, so its logs go to its own file
+                running.add(asyncio.create_task(run_task(actor, *item)))
+                running = {t for t in running if not t.done()}
+            await asyncio.gather(*running)
+        finally:
+            logger.removeHandler(log_handler)
+            executor.shutdown(wait=False)
+        if errors:
+            raise errors[0]
+
+        self.write_acc()
+
+    def write_acc(self):
+        if self.acc is not None:
             with open(f"{self.result_dir}/eval_acc.txt", "w") as f:
-                f.write(str(acc))
+                f.write(str(self.acc))
 
     def test_loop(self):
-        if self.args.num_agents == 1:
-            self.test_loop_serial()
-        elif self.args.num_agents > 1:
-            # self.test_loop_parallel()
-            raise NotImplementedError("Parallel eval not implemented")
+        try:
+            if inspect.iscoroutinefunction(getattr(self.actor, 'test_one', None)):
+                self.test_loop_async()
+            elif self.args.num_agents == 1:
+                self.test_loop_serial()
+            elif self.args.num_agents > 1:
+                self.test_loop_parallel()
+        finally:
+            self.materialize_results()
 
         # Postprocess, for batch eval
         if self.args.eval_later:
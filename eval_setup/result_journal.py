@@ -0,0 +1,115 @@
+"""
+Append-only journal of evaluation results, one JSON line per finished task.
+
+Rewriting result_dict.json after every task costs O(n) per task, O(n^2) per run. Here each result is appended
+as a line and fsync'd, so it survives a crash as soon as it is recorded, and accuracy is kept as running counts.
+result_dict.json is materialized from the journal when needed. Replaying the journal (on resume) ignores a
+torn last line, as left by a crash mid-write.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger("logger")
+
+Result = Union[bool, int, float]
+
+
+class ResultJournal:
+    """
+    Thread-safe, append-only journal of task id to result.
+
+    Attributes:
+        path (str): Path of the JSONL journal.
+        results (dict): Result by task id, replayed from the journal and updated by record.
+        total (float): Sum of the results (ie number of successes, for boolean results).
+    """
+    def __init__(self, path: str, resume: bool = True):
+        """
+        Opens the journal at path, replaying it if resume, else starting it afresh.
+        """
+        self.path = path
+        self.results: Dict[str, Result] = {}
+        self.total = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume and os.path.exists(path):
+            self._replay()
+        self._file = open(path, 'a' if resume else 'w')
+
+    def _replay(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        end = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                # torn write of the last line
+                break
+            try:
+                entry = json.loads(line)
+                self._apply(str(entry['task_id']), entry['result'])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Skipping corrupt line in result journal {self.path}: {e}")
+            end += len(line)
+        if end < len(data):
+            logger.warning(f"Dropping torn last line of result journal {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+    def _apply(self, task_id: str, result: Result):
+        self.total += result - self.results.get(task_id, 0)
+        self.results[task_id] = result
+
+    def record(self, task_id, result: Result):
+        """
+        Appends the result of a task and fsyncs it. A task recorded again keeps its last result.
+        """
+        line = json.dumps({'task_id': str(task_id), 'result': result}) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(str(task_id), result)
+
+    def update(self, results: Dict[str, Result]):
+        """
+        Records several results, eg from a result_dict.json of a run without a journal, with a single fsync.
+        """
+        with self._lock:
+            for task_id, result in results.items():
+                self._file.write(json.dumps({'task_id': str(task_id), 'result': result}) + '\n')
+                self._apply(str(task_id), result)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    @property
+    def acc(self) -> Optional[float]:
+        """
+        Mean result so far, None if no result yet.
+        """
+        return self.total / len(self.results) if self.results else None
+
+    def materialize(self, path: str, indent: Optional[int] = 4):
+        """
+        Writes the results as a JSON dict of task id to result (eg result_dict.json), replacing path atomically.
+        """
+        dirname = os.path.dirname(os.path.abspath(path))
+        with self._lock:
+            results = dict(self.results)
+        with tempfile.NamedTemporaryFile('w', dir=dirname, delete=False) as f:
+            json.dump(results, f, indent=indent)
+        os.replace(f.name, path)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __contains__(self, task_id):
+        return str(task_id) in self.results
+
+    def __len__(self):
+        return len(self.results)
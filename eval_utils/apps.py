@@ -37,6 +37,8 @@ def get_error_type_stats(folder: str) -> dict:
                     error_counts['runtime_error_tle'] += 1
                 elif state == -2:
                     error_counts['compile_error'] += 1
+                elif state == -3:
+                    error_counts['output_limit_exceeded'] += 1
                 else:
                     error_counts['wrong_answer'] += 1
         except (json.JSONDecodeError, FileNotFoundError):
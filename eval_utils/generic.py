@@ -251,3 +251,71 @@ def process_train_stats(base_folder: str, max_attempts: int) -> dict:
         'iterations': list(sorted_successes.keys()),
         'total_tasks': total_tasks
     }
+
+
+def save_test_stats(task_folder: str, test_stats: list) -> bool:
+    """
+    Saves the per-test measurements of a task (see BaseCodeEnv.task_test_stats) as 'test_stats' in the
+    output.json the actor saved, keeping its contents. Done by EvalManager as each task finishes.
+    Nothing is written if there are no measurements, or no (readable) output.json.
+
+    Returns:
+        bool: Whether the measurements were saved.
+    """
+    output_file = os.path.join(task_folder, "output.json")
+    if not test_stats or not os.path.exists(output_file):
+        return False
+    try:
+        with open(output_file, 'r') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(data, dict):
+        return False
+    data['test_stats'] = test_stats
+    with open(output_file, 'w') as f:
+        json.dump(data, f, indent=4)
+    return True
+
+
+def get_test_time_stats(folder: str, top_k: int = 20) -> dict:
+    """
+    Analyzes per-test measurements (the 'test_stats' of env step info) saved in output.json (see save_test_stats),
+    to find the tests and tasks that dominate evaluation time.
+
+    Args:
+        folder: Path to the folder containing task_id folders
+        top_k: Number of slowest tasks and tests to report
+
+    Returns:
+        Dict containing:
+        - 'total_wall_time' / 'total_cpu_time': Sums over all measured tests, in seconds
+        - 'num_tests': Number of measured tests
+        - 'slowest_tasks': (task_id, wall time of its tests) pairs, slowest first
+        - 'slowest_tests': (task_id, test index, test stats) triples, slowest first
+        - 'max_peak_rss': Largest peak RSS of a test, in bytes
+    """
+    task_times = {}
+    tests = []
+    for task_id in os.listdir(folder):
+        output_file = os.path.join(folder, task_id, "output.json")
+        if not os.path.exists(output_file):
+            continue
+        try:
+            with open(output_file, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            continue
+        test_stats = data.get('test_stats') or []
+        task_times[task_id] = sum(stats.get('wall_time', 0) for stats in test_stats)
+        tests.extend((task_id, i, stats) for i, stats in enumerate(test_stats))
+
+    tests.sort(key=lambda x: x[2].get('wall_time', 0), reverse=True)
+    return {
+        'total_wall_time': sum(task_times.values()),
+        'total_cpu_time': sum(stats.get('cpu_time', 0) for _, _, stats in tests),
+        'num_tests': len(tests),
+        'slowest_tasks': sorted(task_times.items(), key=lambda x: x[1], reverse=True)[:top_k],
+        'slowest_tests': tests[:top_k],
+        'max_peak_rss': max((stats.get('peak_rss', 0) for _, _, stats in tests), default=0),
+    }
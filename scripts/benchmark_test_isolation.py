@@ -0,0 +1,44 @@
+"""
+Times PyExecutor.execute in each test isolation mode (see PyExecutor), to compare 'fresh' and 'shared'.
+
+Usage: python -m agent_expt_suite.scripts.benchmark_test_isolation [num_tests] [repeats]
+"""
+import sys
+import time
+
+from ..envs.code.executors.py_executor import PyExecutor
+
+
+def benchmark(num_tests: int = 500, repeats: int = 3):
+    """
+    Times PyExecutor.execute in each isolation mode on test lists the size of MBPP+ ones (hundreds of inputs),
+    for a plain function and for one with module-level setup (a precomputed table) to define.
+    """
+    funcs = {
+        'plain': "def is_prime(n):\n    return n > 1 and all(n % d for d in range(2, int(n ** 0.5) + 1))\n",
+        'setup': (
+            "LIMIT = 200000\n"
+            "SIEVE = [False, False] + [True] * (LIMIT - 1)\n"
+            "for p in range(2, int(LIMIT ** 0.5) + 1):\n"
+            "    if SIEVE[p]:\n"
+            "        SIEVE[p * p::p] = [False] * len(SIEVE[p * p::p])\n"
+            "def is_prime(n):\n"
+            "    return SIEVE[n]\n"
+        ),
+    }
+    primes = {n for n in range(num_tests) if n > 1 and all(n % d for d in range(2, int(n ** 0.5) + 1))}
+    tests = [f"assert is_prime({n}) == {n in primes}" for n in range(num_tests)]
+    for name, func in funcs.items():
+        for isolation in ('fresh', 'shared'):
+            exe = PyExecutor(isolation=isolation)
+            exe.execute(func, tests[:10])
+            start = time.perf_counter()
+            for _ in range(repeats):
+                result = exe.execute(func, tests)
+            elapsed = (time.perf_counter() - start) / repeats
+            print(f"{name} function, {isolation} isolation: {elapsed:.3f}s for {num_tests} tests "
+                  f"({elapsed / num_tests * 1e3:.3f}ms per test), passing: {result.is_passing}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
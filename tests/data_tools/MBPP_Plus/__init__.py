@@ -0,0 +1 @@
+"""Test package for agent_expt_suite.data_tools.MBPP_Plus."""
@@ -0,0 +1,67 @@
+"""Tests for data_tools.MBPP_Plus.ground_truth_store module."""
+
+import pickle
+import tempfile
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from agent_expt_suite.data_tools.MBPP_Plus.ground_truth_store import GroundTruthStore
+
+
+class TestGroundTruthStore(unittest.TestCase):
+    """Test cases for GroundTruthStore."""
+
+    def setUp(self):
+        """Set up ground truth in the format of evalplus, and a store in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.expected_output = {
+            f"Mbpp/{i}": {'base': [i, [i, 'x']], 'base_time': [0.1], 'plus': [{i: None}], 'plus_time': [0.2]}
+            for i in range(5)
+        }
+        self.store = GroundTruthStore(self.tmp_dir.name, 'hash')
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_build_and_read(self):
+        """Test that every task reads back as built, as a private copy."""
+        self.assertFalse(self.store.exists())
+        self.store.build(self.expected_output)
+        self.assertTrue(self.store.exists())
+        self.assertEqual(len(self.store), 5)
+        self.assertIn('Mbpp/3', self.store)
+        self.assertNotIn('Mbpp/9', self.store)
+        self.assertEqual(dict(self.store), self.expected_output)
+        self.store['Mbpp/1']['base'].append(0)
+        self.assertEqual(self.store['Mbpp/1'], self.expected_output['Mbpp/1'])
+
+    def test_reopen_and_pickle(self):
+        """Test that a store opened later, or unpickled in another process, reads the same data."""
+        self.store.build(self.expected_output)
+        self.assertEqual(self.store['Mbpp/0'], self.expected_output['Mbpp/0'])
+        reopened = GroundTruthStore(self.tmp_dir.name, 'hash')
+        self.assertEqual(reopened['Mbpp/4'], self.expected_output['Mbpp/4'])
+        copied = pickle.loads(pickle.dumps(self.store))
+        self.assertEqual(copied['Mbpp/2'], self.expected_output['Mbpp/2'])
+        other = GroundTruthStore(self.tmp_dir.name, 'other_hash')
+        self.assertFalse(other.exists())
+        reopened.close()
+        copied.close()
+
+    def test_concurrent_reads_without_mmap(self):
+        """Test that threads opening and reading the store at once, without mmap, each get their own task."""
+        self.store.build({f"Mbpp/{i}": list(range(i * 100)) for i in range(50)})
+        task_ids = [f"Mbpp/{i % 50}" for i in range(2000)]
+        with mock.patch('mmap.mmap', side_effect=OSError):
+            with ThreadPoolExecutor(8) as executor:
+                outputs = list(executor.map(self.store.__getitem__, task_ids))
+        self.assertIsNone(self.store._mmap)
+        self.assertEqual([len(out) for out in outputs], [(i % 50) * 100 for i in range(2000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for data_tools.prefetch module."""
+
+import threading
+import time
+import unittest
+
+from agent_expt_suite.data_tools.prefetch import PrefetchLoader, prefetch
+
+
+class TestPrefetch(unittest.TestCase):
+    """Test cases for data_tools.prefetch module."""
+
+    def test_same_items(self):
+        """Test that prefetching yields the same items in the same order, for any depth."""
+        for depth in (0, 1, 3, 100):
+            self.assertEqual(list(prefetch(range(20), depth)), list(range(20)))
+
+    def test_loads_ahead(self):
+        """Test that items are loaded in the background while the consumer works, at most depth ahead."""
+        produced = []
+
+        def slow_items():
+            for i in range(6):
+                time.sleep(0.05)
+                produced.append(i)
+                yield i
+
+        start = time.time()
+        for i in prefetch(slow_items(), 2):
+            # the consumer's work, overlapping with loading the next item
+            time.sleep(0.05)
+            # the item being consumed, the queue, and the item being put
+            self.assertLessEqual(len(produced), i + 4)
+        self.assertLess(time.time() - start, 0.55)
+
+    def test_producer_error(self):
+        """Test that an error of the producer is raised in the consumer, after the items before it."""
+        def failing_items():
+            yield 1
+            raise ValueError('bad item')
+
+        items = prefetch(failing_items(), 2)
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(ValueError):
+            next(items)
+
+    def test_close_stops_producer(self):
+        """Test that breaking out of the loop stops the background thread."""
+        for i in prefetch(iter(range(1000)), 2):
+            if i == 3:
+                break
+        deadline = time.time() + 2
+        while any(t.name == 'prefetch' for t in threading.enumerate()) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(any(t.name == 'prefetch' for t in threading.enumerate()))
+
+    def test_loader(self):
+        """Test that a wrapped loader iterates and has the length and attributes of the loader."""
+        loader = PrefetchLoader([[1], [2], [3]], 2)
+        self.assertEqual(list(loader), [[1], [2], [3]])
+        self.assertEqual(len(loader), 3)
+        self.assertEqual(loader.count([2]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+"""Test package for agent_expt_suite.envs.code."""
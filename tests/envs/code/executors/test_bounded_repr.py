@@ -0,0 +1,68 @@
+"""Tests for envs.code.executors.bounded_repr module."""
+
+import unittest
+
+from agent_expt_suite.envs.code.executors.bounded_repr import (
+    bounded_call_assert,
+    bounded_repr,
+    bounded_str,
+    repr_chunks,
+)
+
+
+def _truncate(s, limit):
+    # what the feedback did before: render in full, then cut
+    return s[:limit] + '...' if limit and len(s) > limit else s
+
+
+class TestBoundedRepr(unittest.TestCase):
+    """Test cases for envs.code.executors.bounded_repr module."""
+
+    def setUp(self):
+        """Set up values of the kinds found in MBPP+ inputs and outputs."""
+        self.values = [
+            0, -1.5, float('inf'), None, True, 10 ** 40,
+            '', 'abc', "it's", 'say "hi"', 'both \' and "', 'tab\tnew\nline\\', 'x' * 1000,
+            "'" * 300 + '"', "'" * 300, 'é' * 50,
+            [], [1], [[1, 2], [3, 4]], list(range(500)), ['a' * 100, "b'" * 100],
+            (), (1,), (1, 2), {}, {'a': [1, 2], 3: 'b'}, set(), {1, 2, 3}, frozenset(), frozenset({'a'}),
+            b'bytes', [(1, 'x'), {'k': (2,)}],
+        ]
+
+    def test_chunks_join_to_repr(self):
+        """Test that the chunks without a bound join to the full repr."""
+        for value in self.values:
+            self.assertEqual(''.join(repr_chunks(value)), repr(value))
+
+    def test_same_as_truncated_repr(self):
+        """Test that bounded renderings match rendering in full and cutting, for any bound."""
+        for value in self.values:
+            for limit in (None, 0, 1, 2, 5, 17, 100, 301, 5000):
+                self.assertEqual(bounded_repr(value, limit), _truncate(repr(value), limit), (value, limit))
+                self.assertEqual(bounded_str(value, limit), _truncate(str(value), limit), (value, limit))
+
+    def test_call_assert(self):
+        """Test that MBPP+ tests render as the assert built from their input and output."""
+        args, expected = [[1, 2, 3], 'abc'], [True, 'x' * 500]
+        full = f"assert f({repr(args)[1:-1]})=={repr(expected)}"
+        for limit in (None, 10, 40, 1000):
+            self.assertEqual(bounded_call_assert('f', args, expected, limit), _truncate(full, limit))
+
+    def test_does_not_render_past_bound(self):
+        """Test that rendering stops at the bound, so huge values are never rendered in full."""
+        rendered = []
+
+        class Tracked:
+            def __repr__(self):
+                rendered.append(self)
+                return 'tracked'
+
+        value = [Tracked() for _ in range(10000)]
+        self.assertEqual(bounded_repr(value, 50), _truncate(repr(value), 50))
+        rendered.clear()
+        bounded_repr(value, 50)
+        self.assertLess(len(rendered), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
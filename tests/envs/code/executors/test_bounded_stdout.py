@@ -0,0 +1,73 @@
+"""Tests for the bounded stdout capture in envs.code.executors.utils_execute module."""
+
+import unittest
+
+from agent_expt_suite.envs.code.executors.utils_execute import (
+    BoundedStdout,
+    OutputLimitExceeded,
+    OutputMismatch,
+)
+
+
+class TestBoundedStdout(unittest.TestCase):
+    """Test cases for BoundedStdout and OutputSink."""
+
+    def setUp(self):
+        """Set up an armed capture, as while a solution runs."""
+        self.stdout = BoundedStdout()
+
+    def write_armed(self, text):
+        self.stdout.sink.armed = True
+        try:
+            self.stdout.write(text)
+            self.stdout.flush()
+        finally:
+            self.stdout.sink.armed = False
+
+    def test_captures_output(self):
+        """Test that output within the limit and matching tokens is captured as is."""
+        self.stdout.reset(limit=100, expected_tokens=frozenset({'1', '2'}))
+        self.write_armed("1 2\n3.5\n")
+        self.assertEqual(self.stdout.getvalue(), "1 2\n3.5\n")
+        self.assertIsNone(self.stdout.sink.stopped)
+
+    def test_limit(self):
+        """Test that output over the limit stops the solution, and later writes keep raising."""
+        self.stdout.reset(limit=10)
+        with self.assertRaises(OutputLimitExceeded):
+            self.write_armed("x" * 11)
+        with self.assertRaises(OutputLimitExceeded):
+            self.write_armed("x")
+        self.assertIs(self.stdout.sink.stopped, OutputLimitExceeded)
+
+    def test_mismatch(self):
+        """Test that a token that cannot match stops the solution, across writes split mid token."""
+        self.stdout.reset(limit=100, expected_tokens=frozenset({'yes'}))
+        self.stdout.sink.armed = True
+        self.stdout.write("yes y")
+        self.stdout.flush()
+        self.stdout.write("es ")
+        self.stdout.flush()
+        with self.assertRaises(OutputMismatch):
+            self.stdout.write("no ")
+            self.stdout.flush()
+        self.stdout.sink.armed = False
+        self.assertEqual(self.stdout.getvalue(), "yes yes no ")
+
+    def test_reset(self):
+        """Test that reset clears the output and stopped state, and unarmed writes are not limited."""
+        self.stdout.reset(limit=1)
+        with self.assertRaises(OutputLimitExceeded):
+            self.write_armed("xx")
+        self.stdout.reset(limit=1)
+        self.stdout.write("runner message")
+        self.assertEqual(self.stdout.getvalue(), "runner message")
+        self.assertIsNone(self.stdout.sink.stopped)
+
+    def test_no_binary_buffer(self):
+        """Test that, like a StringIO, the capture has no binary buffer."""
+        self.assertFalse(hasattr(self.stdout, 'buffer'))
+
+
+if __name__ == '__main__':
+    unittest.main()
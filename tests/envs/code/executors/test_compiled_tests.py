@@ -0,0 +1,89 @@
+"""Tests for envs.code.executors.compiled_tests module."""
+
+import copy
+import json
+import unittest
+
+from agent_expt_suite.envs.code.executors.compiled_tests import (
+    compile_test_set,
+    load_compiled_test_set,
+    compare_return,
+    compare_stdout,
+)
+
+
+class TestCompiledTests(unittest.TestCase):
+    """Test cases for envs.code.executors.compiled_tests module."""
+
+    def setUp(self):
+        """Set up a standard input problem and a call-based problem."""
+        self.stdio_in_outs = {"inputs": [["1 2", "3"]], "outputs": [["1 2 ", " 3"]]}
+        self.call_in_outs = {"fn_name": "f", "inputs": [[{"1": 5}]], "outputs": [{"1": 5}]}
+
+    def test_compile_does_not_modify_in_outs(self):
+        """Test that compiling leaves the parsed input_output untouched."""
+        in_outs = copy.deepcopy(self.stdio_in_outs)
+        test_set = compile_test_set(in_outs)
+        self.assertEqual(in_outs, self.stdio_in_outs)
+        self.assertEqual(len(test_set), 1)
+        self.assertIsNone(test_set.fn_name)
+        self.assertEqual(test_set.cases[0].stdin, "1 2\n3")
+        self.assertEqual(test_set.cases[0].expected_lines, ["1 2", "3"])
+
+    def test_load_caches_json(self):
+        """Test that the input_output JSON of a problem is compiled once, and copies share the compiled set."""
+        input_output = json.dumps(self.stdio_in_outs)
+        test_set = load_compiled_test_set(input_output, 'p')
+        self.assertIs(load_compiled_test_set(input_output, 'p'), test_set)
+        self.assertIs(copy.deepcopy(test_set), test_set)
+        # another problem, or other tests under the same id (eg of another split), are compiled on their own
+        self.assertIsNot(load_compiled_test_set(input_output, 'q'), test_set)
+        other = load_compiled_test_set(json.dumps(self.call_in_outs), 'p')
+        self.assertEqual(other.fn_name, 'f')
+        self.assertIsNot(load_compiled_test_set(input_output), test_set)
+
+    def test_load_cache_is_bounded(self):
+        """Test that only the last problems loaded stay compiled."""
+        input_output = json.dumps(self.stdio_in_outs)
+        first = load_compiled_test_set(input_output, 0)
+        for problem_id in range(1, 20):
+            load_compiled_test_set(input_output, problem_id)
+        self.assertIsNot(load_compiled_test_set(input_output, 0), first)
+        self.assertIs(load_compiled_test_set(input_output, 19), load_compiled_test_set(input_output, 19))
+
+    def test_compare_stdout_cascade(self):
+        """Test the verdicts, and the expected output reported, at each stage of the cascade."""
+        case = compile_test_set({"inputs": [""], "outputs": ["1 2\n3.0\n"]}).cases[0]
+        self.assertEqual(compare_stdout(["1 2", "3.0"], case), (True, "1 2\n3.0\n"))
+        self.assertEqual(compare_stdout(["1 2", "3.1"], case), (False, [{"1", "2"}, {"3.0"}]))
+        self.assertEqual(compare_stdout(["3.0", "2 1"], case), (True, [{"1", "2"}, {"3.0"}]))
+        self.assertEqual(compare_stdout(["3", "2 1"], case), (True, [{"1", "2"}, {"3.0"}]))
+        self.assertFalse(compare_stdout(["1 2"], case)[0])
+
+        case = compile_test_set({"inputs": [""], "outputs": ["1\n2"]}).cases[0]
+        self.assertEqual(compare_stdout(["1.0000001", "", "2"], case), (True, ["1", "2"]))
+
+    def test_compare_return(self):
+        """Test that call-based checks convert JSON dict keys and tuples as the official checker does."""
+        case = compile_test_set(self.call_in_outs).cases[0]
+        self.assertEqual(case.args, [{1: 5}])
+        self.assertTrue(compare_return({1: 5}, case))
+        case = compile_test_set({"fn_name": "f", "inputs": [[1]], "outputs": [[[1, 2]]]}).cases[0]
+        self.assertTrue(compare_return((1, 2), case))
+        case = compile_test_set({"fn_name": "f", "inputs": [[1]], "outputs": [[[[1, 2]]]]}).cases[0]
+        self.assertTrue(compare_return([(1, 2)], case))
+        self.assertFalse(compare_return([2, 1], case))
+
+    def test_shard(self):
+        """Test that shards are contiguous, non-empty and concatenate into the whole test set."""
+        in_outs = {"inputs": [str(i) for i in range(7)], "outputs": [str(i) for i in range(7)]}
+        test_set = compile_test_set(in_outs)
+        shards = test_set.shard(3)
+        self.assertEqual([len(shard) for shard in shards], [3, 2, 2])
+        self.assertEqual(sum((shard.cases for shard in shards), ()), test_set.cases)
+        self.assertEqual(len(test_set.shard(10)), 7)
+        self.assertEqual(test_set.shard(1)[0].cases, test_set.cases)
+
+
+if __name__ == '__main__':
+    unittest.main()
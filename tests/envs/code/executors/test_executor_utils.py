@@ -0,0 +1,30 @@
+"""Tests for the per-test measurements in envs.code.executors.executor_utils module."""
+
+import unittest
+
+from agent_expt_suite.envs.code.executors.executor_utils import start_test_stats, record_test_stats
+
+
+class TestTestStats(unittest.TestCase):
+    """Test cases for start_test_stats and record_test_stats."""
+
+    def test_record(self):
+        """Test that wall time, CPU time and peak RSS are recorded for a test."""
+        test_stats = []
+        test_start = start_test_stats(test_stats)
+        sum(range(100000))
+        record_test_stats(test_stats, test_start)
+        self.assertEqual(len(test_stats), 1)
+        stats = test_stats[0]
+        self.assertEqual(set(stats), {'wall_time', 'cpu_time', 'peak_rss'})
+        self.assertGreater(stats['wall_time'], 0)
+        self.assertGreaterEqual(stats['cpu_time'], 0)
+        self.assertGreater(stats['peak_rss'], 0)
+
+    def test_disabled(self):
+        """Test that nothing is recorded without a list."""
+        record_test_stats(None, start_test_stats(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
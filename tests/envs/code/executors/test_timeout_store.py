@@ -0,0 +1,59 @@
+"""Tests for envs.code.executors.timeout_store module."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from agent_expt_suite.envs.code.executors.timeout_store import TimeoutStore, adaptive_timeout
+
+
+class TestTimeoutStore(unittest.TestCase):
+    """Test cases for TimeoutStore."""
+
+    def setUp(self):
+        """Set up a store path in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'timeouts', 'store.json')
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def _on_disk(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_set_writes_on_flush(self):
+        """Test that set only updates memory and flush writes all timeouts set once."""
+        store = TimeoutStore(self.path)
+        for p_id in range(3):
+            store.set(p_id, 0.5 * (p_id + 1))
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(store.get(2), 1.5)
+        store.flush()
+        self.assertEqual(self._on_disk(), {'0': 0.5, '1': 1.0, '2': 1.5})
+
+    def test_flush_merges_other_writers(self):
+        """Test that flushing keeps the timeouts another store flushed meanwhile."""
+        store, other = TimeoutStore(self.path), TimeoutStore(self.path)
+        self.assertNotIn(1, store)
+        other.set(1, 2.0)
+        other.flush()
+        store.set(0, 1.0)
+        store.flush()
+        self.assertEqual(self._on_disk(), {'0': 1.0, '1': 2.0})
+        self.assertEqual(len(store), 2)
+
+    def test_reads_file_on_first_use(self):
+        """Test that a store opened before the timeouts are measured sees them."""
+        reader = TimeoutStore(self.path)
+        writer = TimeoutStore(self.path)
+        writer.set('7', adaptive_timeout([0.01, 0.2]))
+        writer.flush()
+        self.assertEqual(reader.get(7), 0.8)
+        self.assertIsNone(reader.get(8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""Tests for envs.code.executors.utils_evaluate module."""
+
+import json
+import time
+import unittest
+
+from agent_expt_suite.envs.code.executors.utils_evaluate import safe_eval_answer_from_agent
+from agent_expt_suite.envs.code.executors.worker_pool import WorkerPool
+
+
+class TestSafeEvalAnswerFromAgent(unittest.TestCase):
+    """Test cases for scoring several codes of a problem."""
+
+    def setUp(self):
+        """Set up a pool of 3 workers, and an example whose codes each take 0.5s."""
+        # forked, so the workers start with the runner imported
+        self.pool = WorkerPool(num_workers=3, max_jobs_per_worker=None, start_method='fork')
+        slow_code = "import time\ntime.sleep({})\nprint(int(input()) + {})"
+        self.example = {
+            'problem_id': 0,
+            'input_output': json.dumps({'inputs': ['1\n'], 'outputs': ['2\n']}),
+            'gpt_codes': [slow_code.format(0.5, 1), slow_code.format(0.5, 2), slow_code.format(0.5, 1)],
+        }
+        # start the workers, so the timing below is of the codes only
+        warm_up = {**self.example, 'gpt_codes': [slow_code.format(0, 1)] * 3}
+        safe_eval_answer_from_agent(warm_up, pool=self.pool)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_codes_run_concurrently(self):
+        """Test that codes run concurrently up to the size of the pool, with results in the order of the codes."""
+        start = time.monotonic()
+        example = safe_eval_answer_from_agent(self.example, pool=self.pool, test_timeout=4)
+        self.assertLess(time.monotonic() - start, 1.2)
+        self.assertEqual(example['gpt_pass_flags'], [True, False, True])
+
+    def test_num_workers_caps_concurrency(self):
+        """Test that num_workers=1 runs the codes one at a time."""
+        start = time.monotonic()
+        example = safe_eval_answer_from_agent(self.example, pool=self.pool, num_workers=1, test_timeout=4)
+        self.assertGreaterEqual(time.monotonic() - start, 1.5)
+        self.assertEqual(example['gpt_pass_flags'], [True, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
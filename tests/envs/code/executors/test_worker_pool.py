@@ -0,0 +1,134 @@
+"""Tests for envs.code.executors.worker_pool module."""
+
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from agent_expt_suite.envs.code.executors.worker_pool import WorkerPool, WorkerStartupError, CRASHED
+
+
+def _echo_payload(payload, x):
+    return payload, x
+
+
+def _failing_initializer():
+    raise RuntimeError("no sandbox")
+
+
+class TestWorkerPoolPayloads(unittest.TestCase):
+    """Test cases for jobs with payloads kept by the workers."""
+
+    def setUp(self):
+        """Set up a pool of one worker, so every job runs in the same worker."""
+        self.pool = WorkerPool(num_workers=1, max_jobs_per_worker=None, max_payloads=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_payload_sent_once(self):
+        """Test that a worker reuses the payload of a key it holds instead of receiving it again."""
+        job = self.pool.run(_echo_payload, (1,), payload=('a', 'first'))
+        self.assertEqual(job.value, ('first', 1))
+        # a payload is not sent again for the same key, so a different value shows it was kept
+        job = self.pool.run(_echo_payload, (2,), payload=('a', 'second'))
+        self.assertEqual(job.value, ('first', 2))
+
+    def test_payload_eviction(self):
+        """Test that payloads evicted from a worker are sent again."""
+        self.pool.run(_echo_payload, (1,), payload=('a', 'a1'))
+        self.pool.run(_echo_payload, (1,), payload=('b', 'b1'))
+        self.pool.run(_echo_payload, (1,), payload=('c', 'c1'))
+        # 'a' was evicted, 'c' was kept
+        self.assertEqual(self.pool.run(_echo_payload, (1,), payload=('a', 'a2')).value, ('a2', 1))
+        self.assertEqual(self.pool.run(_echo_payload, (1,), payload=('c', 'c2')).value, ('c1', 1))
+
+    def test_map_with_payloads(self):
+        """Test that map passes each job its payload, in order."""
+        jobs = self.pool.map(_echo_payload, [(i,) for i in range(3)], payloads=[('k', 'v')] * 3)
+        self.assertEqual([job.value for job in jobs], [('v', i) for i in range(3)])
+
+
+class TestWorkerPoolStartup(unittest.TestCase):
+    """Test cases for workers that fail to start, as opposed to jobs that crash their worker."""
+
+    def test_startup_failure_raises(self):
+        """Test that workers dying before their first job raise instead of returning a failed job."""
+        pool = WorkerPool(num_workers=1, initializer=_failing_initializer)
+        with self.assertRaises(WorkerStartupError):
+            pool.run(os.getpid)
+        # the failed workers are not counted as live
+        pool.initializer = None
+        self.assertTrue(pool.run(os.getpid).ok)
+        pool.close()
+
+    def test_job_crash_is_a_result(self):
+        """Test that a job taking its worker down is reported as CRASHED, and the worker replaced."""
+        pool = WorkerPool(num_workers=1)
+        self.assertEqual(pool.run(os._exit, (1,)).status, CRASHED)
+        self.assertTrue(pool.run(os.getpid).ok)
+        pool.close()
+
+    def test_main_from_stdin(self):
+        """Test that a pool started from a script read from stdin, which workers cannot import, runs jobs."""
+        out = subprocess.run(
+            [sys.executable, '-'], input=_STDIN_SCRIPT, capture_output=True, text=True, timeout=60, check=True,
+        ).stdout
+        self.assertEqual(out.strip(), 'ok')
+
+
+_STDIN_SCRIPT = """
+import os
+from agent_expt_suite.envs.code.executors.worker_pool import WorkerPool
+
+print(WorkerPool(num_workers=1).run(os.getpid).status)
+"""
+
+
+# starts a pool, prints the pids of its workers and exits without stopping them, as a killed evaluator would
+_ORPHAN_SCRIPT = """
+import os, sys
+from agent_expt_suite.envs.code.executors.worker_pool import WorkerPool, WorkerStartupError, CRASHED
+
+if __name__ == '__main__':
+    pool = WorkerPool(num_workers=3, max_jobs_per_worker=None, start_method=sys.argv[1])
+    print(' '.join(str(job.value) for job in pool.map(os.getpid, [()] * 6)), flush=True)
+    os._exit(0)
+"""
+
+
+def _is_running(pid):
+    # exited workers can stay zombies if nothing reaps them
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@unittest.skipUnless(os.path.isdir('/proc'), "needs /proc")
+class TestWorkerPoolLifetime(unittest.TestCase):
+    """Test cases for workers outliving the pool's process."""
+
+    def _assert_workers_exit(self, start_method):
+        out = subprocess.run(
+            [sys.executable, '-c', _ORPHAN_SCRIPT, start_method],
+            capture_output=True, text=True, timeout=60, check=True,
+        ).stdout
+        pids = {int(pid) for pid in out.split()}
+        self.assertTrue(pids)
+        deadline = time.monotonic() + 10
+        while any(_is_running(pid) for pid in pids) and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertFalse([pid for pid in pids if _is_running(pid)])
+
+    def test_workers_exit_with_pool_process(self):
+        """Test that workers exit once the pool's process dies without stopping them."""
+        for start_method in ('fork', 'forkserver'):
+            with self.subTest(start_method=start_method):
+                self._assert_workers_exit(start_method)
+
+
+if __name__ == '__main__':
+    unittest.main()
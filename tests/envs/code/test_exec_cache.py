@@ -0,0 +1,117 @@
+"""Tests for envs.code.exec_cache module."""
+
+import unittest
+import tempfile
+
+from agent_expt_suite.envs.code.APPS_code_env import AppsCodeEnv
+from agent_expt_suite.envs.code.base_code_env import BaseCodeEnv
+from agent_expt_suite.envs.code.exec_cache import ExecutionCache, make_cache_key, make_content_key
+
+
+class _CountingEnv(BaseCodeEnv):
+    """Env whose steps count their executions and report given outcomes and one measured test."""
+
+    outcomes = (True,)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.num_executions = 0
+
+    def _reset(self, task):
+        self.private_tests = task['tests']
+
+    def _step(self, full_code, use_public_tests=False):
+        self.num_executions += 1
+        info = {'individual_results': self.outcomes, 'test_stats': [{'wall_time': 1.0}]}
+        return 'feedback', all(res == True for res in self.outcomes), None, info
+
+
+class _AppsOutcomesEnv(_CountingEnv, AppsCodeEnv):
+    """APPS env whose steps report given outcomes without executing."""
+
+
+class TestExecutionCache(unittest.TestCase):
+    """Test cases for envs.code.exec_cache module."""
+
+    def setUp(self):
+        """Set up a cache in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ExecutionCache(self.tmp_dir.name)
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def test_make_cache_key_separates_parts(self):
+        """Test that keys depend on how the parts are split, not only their concatenation."""
+        self.assertEqual(make_cache_key('ab', 'c'), make_cache_key('ab', 'c'))
+        self.assertNotEqual(make_cache_key('ab', 'c'), make_cache_key('a', 'bc'))
+
+    def test_make_content_key(self):
+        """Test that content keys change with the values, not only their sizes, and match their reprs."""
+        inputs, outputs = [[1, 'a'], [2, 'b']], {'base': [True, False], 'base_time': [0.1, 0.2]}
+        key = make_content_key(inputs, outputs)
+        self.assertEqual(key, make_content_key([[1, 'a'], [2, 'b']], dict(outputs)))
+        self.assertNotEqual(key, make_content_key([[1, 'a'], [2, 'c']], outputs))
+        self.assertNotEqual(key, make_content_key(inputs, {**outputs, 'base': [True, True]}))
+        self.assertEqual(key, make_cache_key(repr(inputs), repr(outputs)))
+
+    def test_cached_step_runs_no_tests(self):
+        """Test that a step served from the cache reports no measurements, and is marked as cached."""
+        env = _CountingEnv(exec_cache_dir=self.tmp_dir.name)
+        env.reset({'task_id': 'a', 'tests': ['assert True']})
+        _, _, _, info = env.step('code')
+        self.assertNotIn('cached', info)
+        _, reward, _, info = env.step('code')
+        self.assertTrue(reward)
+        self.assertTrue(info['cached'])
+        self.assertEqual(info['test_stats'], [])
+        self.assertEqual(env.num_executions, 1)
+        self.assertEqual(env.task_test_stats, [{'wall_time': 1.0}])
+
+    def test_apps_does_not_cache_runtime_errors(self):
+        """Test that APPS steps with a -1 outcome, which may be a time limit exceeded, are run again."""
+        env = _AppsOutcomesEnv(exec_cache_dir=self.tmp_dir.name)
+        for outcomes, num_executions in (((True, -1), 2), ((True, False), 1)):
+            env.outcomes = outcomes
+            env.reset({'task_id': str(outcomes), 'tests': []})
+            env.step('code')
+            env.step('code')
+            self.assertEqual(env.num_executions, num_executions)
+            env.num_executions = 0
+
+    def test_get_put(self):
+        """Test storing and retrieving a step result, and the hit/miss counters."""
+        result = ('feedback', True, None, {'individual_results': (True, True)})
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.put('key', result)
+        self.assertEqual(self.cache.get('key'), result)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+    def test_shared_between_instances(self):
+        """Test that another cache on the same directory sees stored results."""
+        self.cache.put('key', 'value')
+        other = ExecutionCache(self.tmp_dir.name)
+        self.assertEqual(other.get('key'), 'value')
+
+    def test_evicts_least_recently_used(self):
+        """Test that the total size stays bounded, evicting the least recently used entries first."""
+        value = 'x' * 1000
+        cache = ExecutionCache(self.tmp_dir.name, max_bytes=2500)
+        cache.put('a', value)
+        cache.put('b', value)
+        cache.get('a')
+        cache.put('c', value)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), value)
+        self.assertEqual(cache.get('c'), value)
+        self.assertLessEqual(cache.stats()['total_bytes'], 2500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Tests for eval_setup.result_journal module."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from agent_expt_suite.eval_setup.result_journal import ResultJournal
+
+
+class TestResultJournal(unittest.TestCase):
+    """Test cases for eval_setup.result_journal module."""
+
+    def setUp(self):
+        """Set up a journal path in a temporary directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'result_journal.jsonl')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_record_and_replay(self):
+        """Test that results and counters survive reopening the journal."""
+        journal = ResultJournal(self.path)
+        journal.record('1', True)
+        journal.record(2, False)
+        journal.record('3', True)
+        # recorded again, the last result counts
+        journal.record('3', False)
+        self.assertEqual(journal.results, {'1': True, '2': False, '3': False})
+        self.assertEqual(journal.total, 1)
+        self.assertAlmostEqual(journal.acc, 1 / 3)
+        journal.close()
+
+        replayed = ResultJournal(self.path)
+        self.assertEqual(replayed.results, journal.results)
+        self.assertEqual(replayed.total, 1)
+        self.assertIn(2, replayed)
+        replayed.close()
+
+    def test_torn_last_line(self):
+        """Test that a torn last line is dropped, and later records are still read back."""
+        journal = ResultJournal(self.path)
+        journal.record('1', True)
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('{"task_id": "2", "res')
+
+        journal = ResultJournal(self.path)
+        self.assertEqual(journal.results, {'1': True})
+        journal.record('3', True)
+        journal.close()
+        journal = ResultJournal(self.path)
+        self.assertEqual(journal.results, {'1': True, '3': True})
+        journal.close()
+
+    def test_no_resume(self):
+        """Test that a journal opened without resume starts afresh."""
+        journal = ResultJournal(self.path)
+        journal.record('1', True)
+        journal.close()
+        journal = ResultJournal(self.path, resume=False)
+        self.assertEqual(len(journal), 0)
+        self.assertIsNone(journal.acc)
+        journal.close()
+
+    def test_materialize(self):
+        """Test that the results are written as a result dict."""
+        journal = ResultJournal(self.path)
+        journal.update({'1': True, '2': False})
+        result_path = os.path.join(self.tmp_dir.name, 'result_dict.json')
+        journal.materialize(result_path)
+        with open(result_path) as f:
+            self.assertEqual(json.load(f), {'1': True, '2': False})
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests for eval_utils.generic module."""
+
+import json
+import os
+import tempfile
+import unittest
+
+from agent_expt_suite.envs.code.base_code_env import BaseCodeEnv
+from agent_expt_suite.eval_utils.generic import get_test_time_stats, save_test_stats
+
+
+class _TimedEnv(BaseCodeEnv):
+    """Env whose steps report one measured test per character of the code."""
+
+    def _step(self, full_code, use_public_tests=False):
+        test_stats = [{'wall_time': float(i + 1), 'cpu_time': 0.5, 'peak_rss': 100 * (i + 1)}
+                      for i in range(len(full_code))]
+        return 'feedback', True, None, {'individual_results': (True,), 'test_stats': test_stats}
+
+
+class TestTestTimeStats(unittest.TestCase):
+    """Test cases for saving and analyzing per-test measurements."""
+
+    def setUp(self):
+        """Set up a results folder and an env."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.env = _TimedEnv()
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def _save_output(self, task_id, output):
+        """Saves the output.json of a task, as an actor does."""
+        os.makedirs(os.path.join(self.tmp_dir.name, task_id), exist_ok=True)
+        with open(os.path.join(self.tmp_dir.name, task_id, 'output.json'), 'w') as f:
+            json.dump(output, f)
+
+    def _run_task(self, task_id, codes):
+        """Steps the env on a task, then saves its measurements as EvalManager does."""
+        self.env.reset({'task_id': task_id})
+        for code in codes:
+            self.env.step(code)
+        return save_test_stats(os.path.join(self.tmp_dir.name, task_id), self.env.task_test_stats)
+
+    def test_env_collects_stats_of_task(self):
+        """Test that the env collects the measurements of all steps on a task, and resets them per task."""
+        self.env.reset({'task_id': 'a'})
+        self.env.step('xy')
+        self.env.step('z')
+        self.assertEqual([s['wall_time'] for s in self.env.task_test_stats], [1.0, 2.0, 1.0])
+        self.env.reset({'task_id': 'b'})
+        self.assertEqual(self.env.task_test_stats, [])
+
+    def test_saved_stats_are_analyzed(self):
+        """Test that measurements saved with the task outputs are found by get_test_time_stats."""
+        # the actor's own output is kept
+        self._save_output('slow', {'full_code': 'code', 'reward': True})
+        self._save_output('fast', {})
+        self.assertTrue(self._run_task('slow', ['abc']))
+        self.assertTrue(self._run_task('fast', ['a']))
+
+        with open(os.path.join(self.tmp_dir.name, 'slow', 'output.json')) as f:
+            self.assertEqual(json.load(f)['full_code'], 'code')
+        stats = get_test_time_stats(self.tmp_dir.name, top_k=2)
+        self.assertEqual(stats['num_tests'], 4)
+        self.assertEqual(stats['total_wall_time'], 7.0)
+        self.assertEqual(stats['total_cpu_time'], 2.0)
+        self.assertEqual(stats['slowest_tasks'], [('slow', 6.0), ('fast', 1.0)])
+        self.assertEqual(stats['slowest_tests'][0][:2], ('slow', 2))
+        self.assertEqual(stats['max_peak_rss'], 300)
+
+    def test_stats_only_added_to_saved_output(self):
+        """Test that measurements are not saved for tasks without an output.json, or without measurements."""
+        self.assertFalse(self._run_task('unsaved', ['abc']))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'unsaved')))
+        self._save_output('untested', {'full_code': ''})
+        self.assertFalse(self._run_task('untested', []))
+        with open(os.path.join(self.tmp_dir.name, 'untested', 'output.json')) as f:
+            self.assertEqual(json.load(f), {'full_code': ''})
+
+
+if __name__ == '__main__':
+    unittest.main()